@@ -1,5 +1,7 @@
 import pandas as pd
 import os
+import sys
+import argparse
 import numpy as np
 from datetime import datetime
 
@@ -9,11 +11,23 @@ from datetime import datetime
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
+sys.path.append(os.path.join(BASE_DIR, "..", "src"))
+from schema import clean_text, fill_category, load_stage
+from snapshot import publish_snapshot
+from drift import ANOMALY_FILE, DriftMonitor, append_anomalies
+from trending import TRENDING_FILE, TrendingTracker
+
 DATA_FILE = os.path.join(BASE_DIR, "..", "src", "send", "tweets_with_sentiment.csv")
 METRICS_FILE = os.path.join(BASE_DIR, "..", "data", "analysis", "dashboard_metrics.csv")
 INSIGHT_FILE = os.path.join(BASE_DIR, "..", "data", "analysis", "dashboard_insights.csv")
 STATE_FILE = os.path.join(BASE_DIR, "..", "data", "analysis", "genz_state.csv")
 
+# Count each near-duplicate story cluster once instead of every syndicated
+# copy. Default for --count-clusters in both analysis.py and the daemon.
+COUNT_CLUSTERS = False
+
+EDU_KEYWORDS = ["education","college","exam","career","degree","skill"]
+
 os.makedirs(os.path.dirname(METRICS_FILE), exist_ok=True)
 
 print("Running Gen-Z Behavioral Analytics Engine (Safe Mode + Source Metrics)...")
@@ -31,11 +45,25 @@ def load_state():
             return pd.DataFrame()
     return pd.DataFrame()
 
+def last_dominant_group():
+    prev_state = load_state()
+    if not prev_state.empty and 'dominant_group' in prev_state.columns:
+        return prev_state.iloc[-1]['dominant_group']
+    return None
+
 def append_state(row_dict):
     try:
-        old_df = load_state()
         new_row = pd.DataFrame([row_dict])
 
+        # Same columns as the file: append in place instead of rewriting history
+        if os.path.exists(STATE_FILE):
+            header = list(pd.read_csv(STATE_FILE, nrows=0).columns)
+            if header == list(new_row.columns):
+                new_row.to_csv(STATE_FILE, mode="a", header=False, index=False)
+                return
+
+        old_df = load_state()
+
         # Align columns automatically
         if not old_df.empty:
             combined = pd.concat([old_df, new_row], ignore_index=True, sort=False)
@@ -48,40 +76,114 @@ def append_state(row_dict):
         print("State file update warning:", e)
 
 # ==================================================
-# MAIN ANALYSIS FUNCTION
+# INCREMENTAL SUMMARY
 # ==================================================
+# Every KPI is derived from these counters and sums, so a new batch can be
+# folded into the running totals without rescanning earlier rows.
 
-def run_analysis():
+def prepare_frame(df):
+    df['timestamp'] = pd.to_datetime(df['timestamp'], errors="coerce")
+    df = df.dropna(subset=['timestamp', 'sentiment_label'])
+    df['sentiment_label'] = df['sentiment_label'].str.lower().astype("category")
+    df['hour'] = df['timestamp'].dt.hour
+    df['source'] = fill_category(df['source'], "Unknown")
+    # Derived from text; the stored files do not carry it
+    df['clean_text'] = df['text'].map(clean_text)
+
+    # Categories of dropped rows would otherwise show up as zero counts
+    for col in ['topic', 'source']:
+        df[col] = df[col].cat.remove_unused_categories()
+    return df
+
+def empty_summary():
+    return {
+        "total": 0,
+        "sentiment": {},
+        "topic": {},
+        "hour": {},
+        "source_sentiment": {},
+        "confidence_sum": 0.0,
+        "confidence_n": 0,
+        "score_sum": 0.0,
+        "score_sq_sum": 0.0,
+        "score_n": 0,
+        "edu_mentions": 0,
+        "night_rows": 0,
+        "leader_rows": 0,
+    }
 
-    if not os.path.exists(DATA_FILE):
-        print("Input CSV not found")
-        return
+def _counts(series):
+    counts = series.value_counts()
+    return {k: int(v) for k, v in counts[counts > 0].items()}
+
+def summarize(df):
+    scores = df['sentiment_score'].dropna().astype("float64")
+    confidence = df['sent_confidence'].dropna().astype("float64")
+    edu_mentions = df['clean_text'].str.contains("|".join(EDU_KEYWORDS), case=False, na=False)
+
+    source_sentiment = {}
+    for (src, sent), v in df.groupby(['source','sentiment_label'], observed=True).size().items():
+        source_sentiment.setdefault(src, {})[sent] = int(v)
+
+    return {
+        "total": len(df),
+        "sentiment": _counts(df['sentiment_label']),
+        "topic": _counts(df['topic']),
+        "hour": {int(k): v for k, v in _counts(df['hour']).items()},
+        "source_sentiment": source_sentiment,
+        "confidence_sum": float(confidence.sum()),
+        "confidence_n": len(confidence),
+        "score_sum": float(scores.sum()),
+        "score_sq_sum": float((scores ** 2).sum()),
+        "score_n": len(scores),
+        "edu_mentions": int(edu_mentions.sum()),
+        "night_rows": int((df['hour'] >= 22).sum()),
+        "leader_rows": int((df['sent_confidence'] > 0.75).sum()),
+    }
 
-    df = pd.read_csv(DATA_FILE)
+def _add_counts(a, b):
+    merged = dict(a)
+    for k, v in b.items():
+        merged[k] = merged.get(k, 0) + v
+    return merged
 
-    if df.empty:
-        print("CSV empty")
-        return
+def merge_summaries(base, new):
+    merged = {k: base[k] + new[k] for k in base if not isinstance(base[k], dict)}
+    for k in ["sentiment", "topic", "hour"]:
+        merged[k] = _add_counts(base[k], new[k])
 
-    # ----------------------------
-    # Cleaning
-    # ----------------------------
-    df['timestamp'] = pd.to_datetime(df['timestamp'], errors="coerce")
-    df = df.dropna(subset=['timestamp', 'sentiment_label'])
-    df['sentiment_label'] = df['sentiment_label'].str.lower()
-    df['hour'] = df['timestamp'].dt.hour
-    df['source'] = df['source'].fillna("Unknown")
+    merged["source_sentiment"] = dict(base["source_sentiment"])
+    for src, counts in new["source_sentiment"].items():
+        merged["source_sentiment"][src] = _add_counts(merged["source_sentiment"].get(src, {}), counts)
+    return merged
 
-    total = len(df)
+def _ranked(counts):
+    return sorted(counts.items(), key=lambda kv: kv[1], reverse=True)
 
-    # ----------------------------
-    # Base Metrics
-    # ----------------------------
-    sentiment_counts = df['sentiment_label'].value_counts()
-    topic_counts = df['topic'].value_counts()
-    hour_counts = df['hour'].value_counts()
-    confidence_avg = df['sent_confidence'].mean()
-    volatility = df['sentiment_score'].std()
+# ==================================================
+# OUTPUT WRITERS
+# ==================================================
+
+def write_outputs(summary, last_group=None, record_state=True):
+    """
+    Writes dashboard_metrics.csv and dashboard_insights.csv and, unless
+    record_state is False, appends a genz_state.csv row from a summary.
+    Returns the dominant group.
+    """
+    total = summary["total"]
+    sentiment_counts = summary["sentiment"]
+    topic_counts = summary["topic"]
+    hour_counts = summary["hour"]
+
+    confidence_avg = summary["confidence_sum"] / summary["confidence_n"] if summary["confidence_n"] else np.nan
+
+    # Sample standard deviation (ddof=1), same as pandas .std()
+    n = summary["score_n"]
+    if n > 1:
+        variance = (summary["score_sq_sum"] - summary["score_sum"] ** 2 / n) / (n - 1)
+        volatility = float(np.sqrt(max(variance, 0.0)))
+    else:
+        volatility = np.nan
 
     positive_pct = (sentiment_counts.get("positive",0)/total)*100
     negative_pct = (sentiment_counts.get("negative",0)/total)*100
@@ -90,11 +192,11 @@ def run_analysis():
     # ----------------------------
     # SOURCE SENTIMENT METRICS NEW
     # ----------------------------
-    source_sentiment_counts = (
-        df.groupby(['source','sentiment_label'])
-          .size()
-          .sort_values(ascending=False)
-    )
+    source_sentiment_counts = _ranked({
+        (src, sent): v
+        for src, counts in summary["source_sentiment"].items()
+        for sent, v in counts.items()
+    })
 
     # ----------------------------
     # DASHBOARD METRICS FILE
@@ -102,19 +204,19 @@ def run_analysis():
     metrics_rows = []
 
     # Sentiment
-    for k,v in sentiment_counts.items():
+    for k,v in _ranked(sentiment_counts):
         metrics_rows.append(["sentiment", k, "", v])
 
     # Topic volume
-    for k,v in topic_counts.items():
+    for k,v in _ranked(topic_counts):
         metrics_rows.append(["topic_volume", k, "", v])
 
     # Hourly activity
-    for k,v in hour_counts.items():
+    for k,v in _ranked(hour_counts):
         metrics_rows.append(["hour_activity", k, "", v])
 
     # Source sentiment
-    for (src, sent), v in source_sentiment_counts.items():
+    for (src, sent), v in source_sentiment_counts:
         metrics_rows.append(["source", f"{src}-{sent}", "", v])
 
     metrics_df = pd.DataFrame(
@@ -130,34 +232,29 @@ def run_analysis():
 
     mind_growth = round((neutral_pct + (confidence_avg * 100)) / 2, 2)
 
-    edu_keywords = ["education","college","exam","career","degree","skill"]
-    edu_mentions = df['clean_text'].str.contains("|".join(edu_keywords), case=False, na=False)
-    education_awareness = round((edu_mentions.sum() / total) * 100, 2)
+    education_awareness = round((summary["edu_mentions"] / total) * 100, 2)
 
     political_maturity = round(100 - abs(positive_pct - negative_pct), 2)
 
     emotional_stability = round(1 / (1 + volatility), 3)
 
-    dominant_group = topic_counts.idxmax()
+    dominant_group = max(topic_counts, key=topic_counts.get)
 
-    night_ratio = round((len(df[df['hour'] >= 22]) / total) * 100, 2)
+    night_ratio = round((summary["night_rows"] / total) * 100, 2)
 
-    responsiveness = round((hour_counts.max() / total) * 100, 2)
+    responsiveness = round((max(hour_counts.values()) / total) * 100, 2)
 
-    leadership_voice = round((len(df[df['sent_confidence'] > 0.75]) / total) * 100, 2)
+    leadership_voice = round((summary["leader_rows"] / total) * 100, 2)
 
     psychological_resilience = round(100 - (volatility * 100), 2)
 
     # ----------------------------
     # SAFE TREND SENSITIVITY
     # ----------------------------
-    prev_state = load_state()
     trend_sensitivity = "Stable"
 
-    if not prev_state.empty and 'dominant_group' in prev_state.columns:
-        last_group = prev_state.iloc[-1]['dominant_group']
-        if dominant_group != last_group:
-            trend_sensitivity = "High"
+    if last_group is not None and dominant_group != last_group:
+        trend_sensitivity = "High"
 
     # ----------------------------
     # APPEND STATE SAFELY
@@ -176,7 +273,8 @@ def run_analysis():
         "dominant_group": dominant_group
     }
 
-    append_state(state_row)
+    if record_state:
+        append_state(state_row)
 
     # ----------------------------
     # DASHBOARD INSIGHTS
@@ -197,15 +295,138 @@ def run_analysis():
     insight_df = pd.DataFrame(insights, columns=["metric","value"])
     insight_df.to_csv(INSIGHT_FILE, index=False)
 
+    return dominant_group
+
+# ==================================================
+# DRIFT MONITOR
+# ==================================================
+
+def update_drift(df, monitor=None):
+    """
+    Folds rows the drift monitor has not seen into its EWMA / CUSUM state
+    and appends any alerts to anomalies.csv.
+    """
+    try:
+        monitor = monitor or DriftMonitor()
+        anomalies = monitor.update(df)
+        monitor.save()
+        append_anomalies(anomalies)
+        if not anomalies.empty:
+            print(f"{len(anomalies)} drift anomalies detected.")
+        return anomalies
+
+    except Exception as e:
+        print("Drift monitor warning:", e)
+
+# ==================================================
+# TRENDING TERMS
+# ==================================================
+
+def update_trending(df, tracker=None):
+    """
+    Folds unseen rows into the per topic-day term sketches and rewrites
+    trending_terms.csv from them.
+    """
+    try:
+        tracker = tracker or TrendingTracker()
+        tracker.update(df)
+        tracker.save()
+        trending = tracker.trending()
+        trending.to_csv(TRENDING_FILE, index=False)
+        return trending
+
+    except Exception as e:
+        print("Trending terms warning:", e)
+
+# ==================================================
+# DASHBOARD SNAPSHOT
+# ==================================================
+
+def publish_dashboard_snapshot(tweets_df=None, tweets_batch=None):
+    """
+    Publishes the dashboard inputs as a new Arrow snapshot version.
+    Pass the full scored frame as tweets_df, or only the new rows as
+    tweets_batch to append them to the current snapshot.
+    """
+    try:
+        tables = {}
+        if tweets_df is not None:
+            tables["tweets"] = tweets_df
+        for name, path in [("metrics", METRICS_FILE), ("insights", INSIGHT_FILE), ("state", STATE_FILE), ("anomalies", ANOMALY_FILE),
+                           ("trending", TRENDING_FILE)]:
+            if os.path.exists(path):
+                tables[name] = pd.read_csv(path)
+
+        append = {"tweets": tweets_batch} if tweets_batch is not None else None
+        return publish_snapshot(tables, append=append)
+
+    except Exception as e:
+        print("Snapshot publish warning:", e)
+
+# ==================================================
+# MAIN ANALYSIS FUNCTION
+# ==================================================
+
+def count_clusters_once(df):
+    """Keeps one row per story cluster, the first one in the frame."""
+    if 'cluster_id' not in df.columns:
+        return df
+    return df.drop_duplicates(subset=['cluster_id'])
+
+def kpi_frame(df, count_clusters=COUNT_CLUSTERS):
+    """
+    Rows the KPIs count: cleaned first, then one per story cluster, so a
+    cluster whose first row has no timestamp is counted by the next one.
+    """
+    df = prepare_frame(df)
+    if count_clusters:
+        df = count_clusters_once(df)
+    return df
+
+def run_analysis(count_clusters=COUNT_CLUSTERS):
+
+    if not os.path.exists(DATA_FILE):
+        print("Input CSV not found")
+        return
+
+    df = load_stage(DATA_FILE)
+
+    if df.empty:
+        print("CSV empty")
+        return
+
+    # Rows as the dashboard shows them, before KPI-only cleaning
+    tweets_df = df.dropna(subset=['timestamp'])
+
+    # ----------------------------
+    # Cleaning
+    # ----------------------------
+    df = kpi_frame(df, count_clusters)
+
+    write_outputs(summarize(df), last_dominant_group())
+    update_drift(df)
+    update_trending(df)
+
+    version = publish_dashboard_snapshot(tweets_df=tweets_df)
+
     print("Gen-Z Behavioral Insights Updated Safely")
     print("Files Generated:")
     print(" - dashboard_metrics.csv")
     print(" - dashboard_insights.csv")
     print(" - genz_state.csv")
+    print(" - anomalies.csv")
+    print(" - trending_terms.csv")
+    if version:
+        print(f" - snapshot {version}")
 
 # ==================================================
 # RUN
 # ==================================================
 
 if __name__ == "__main__":
-    run_analysis()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Gen-Z KPI aggregation")
+    parser.add_argument("--count-clusters", action="store_true", default=COUNT_CLUSTERS,
+                        help="Count each near-duplicate story cluster once instead of every copy")
+    args = parser.parse_args()
+
+    run_analysis(count_clusters=args.count_clusters)
@@ -0,0 +1,203 @@
+import os
+import json
+import math
+import pandas as pd
+from datetime import datetime
+
+# ==================================================
+# ONLINE DRIFT / ANOMALY DETECTION
+# ==================================================
+# Per topic and per source, the monitor tracks two series: article volume
+# and mean sentiment_score per event-time period (a day by default). Each
+# series keeps an EWMA mean and variance and a two-sided CUSUM on the
+# standardized residual, so folding in a new period costs O(1) per key and
+# no earlier rows are ever re-read.
+#
+# Rows are folded by row_id: only ids above the highest one already seen
+# are counted, so re-running the batch analysis over the full dataset and
+# feeding daemon micro-batches both update the same state exactly once.
+#
+# Periods close on an event-time watermark, the same rule the daemon uses
+# for its KPIs: a period stays open until the newest event time seen is
+# ALLOWED_LATENESS_HOURS past its end, so on-time rows that land after
+# midnight still count for their own day. Only rows for periods that were
+# already closed are skipped as late. Days with no rows at all between two
+# closed periods are recorded as zero-volume observations.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DRIFT_STATE_FILE = os.path.join(BASE_DIR, "..", "data", "analysis", "drift_state.json")
+ANOMALY_FILE = os.path.join(BASE_DIR, "..", "data", "analysis", "anomalies.csv")
+
+PERIOD = "D"               # pandas frequency of one observation
+ALLOWED_LATENESS_HOURS = 6 # same default as the daemon's watermark
+PERIOD_FORMAT = "%Y-%m-%d %H:%M"
+DIMENSIONS = ["topic", "source"]
+EWMA_ALPHA = 0.3
+CUSUM_K = 0.5              # slack, in standard deviations
+CUSUM_H = 4.0              # alarm threshold, in standard deviations
+WARMUP_PERIODS = 3         # observations before a series can alert
+MIN_SENTIMENT_ROWS = 3     # smaller periods give too noisy a mean to score
+MIN_STD = {"volume": 1.0, "sentiment": 0.05}
+
+ANOMALY_COLUMNS = [
+    "detected_at", "period", "dimension", "key", "metric",
+    "direction", "value", "baseline", "zscore", "cusum",
+]
+
+
+def new_series():
+    return {"n": 0, "mean": 0.0, "var": 0.0, "pos": 0.0, "neg": 0.0}
+
+
+def update_series(series, x, min_std):
+    """
+    Folds one observation into an EWMA + CUSUM series in place.
+    Returns (direction, zscore, cusum) when the CUSUM alarms, else None.
+    """
+    alert = None
+    if series["n"] >= WARMUP_PERIODS:
+        std = max(math.sqrt(series["var"]), min_std)
+        z = (x - series["mean"]) / std
+        series["pos"] = max(0.0, series["pos"] + z - CUSUM_K)
+        series["neg"] = max(0.0, series["neg"] - z - CUSUM_K)
+        if series["pos"] > CUSUM_H:
+            alert = ("up", z, series["pos"])
+        elif series["neg"] > CUSUM_H:
+            alert = ("down", z, series["neg"])
+        if alert:
+            # Restart accumulation so a sustained shift is reported once
+            series["pos"] = series["neg"] = 0.0
+
+    if series["n"] == 0:
+        series["mean"] = float(x)
+    else:
+        diff = x - series["mean"]
+        incr = EWMA_ALPHA * diff
+        series["mean"] += incr
+        series["var"] = (1 - EWMA_ALPHA) * (series["var"] + diff * incr)
+    series["n"] += 1
+    return alert
+
+
+class DriftMonitor:
+
+    def __init__(self, path=DRIFT_STATE_FILE, lateness_hours=ALLOWED_LATENESS_HOURS):
+        self.path = path
+        self.lateness = pd.Timedelta(hours=lateness_hours)
+        self.state = {"max_row_id": -1, "max_event_time": None, "last_closed": None, "open": {}, "series": {}}
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self.state = json.load(f)
+            except (OSError, ValueError):
+                print("Drift state unreadable, starting empty.")
+
+        if "open_period" in self.state:
+            # Older state kept a single open period
+            period = self.state.pop("open_period")
+            self.state["open"] = {period: self.state["open"]} if period else {}
+            self.state.setdefault("max_event_time", None)
+            self.state.setdefault("last_closed", None)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.path)
+
+    # ----------------------------
+    # Periods
+    # ----------------------------
+    def _close_period(self, period, open_totals):
+        """Turns one period's per-key totals into one observation per series."""
+        alerts = []
+
+        for key in set(self.state["series"]) | set(open_totals):
+            dimension, name = key.split(":", 1)
+            count, scored, score_sum = open_totals.get(key, (0, 0, 0.0))
+            series = self.state["series"].setdefault(key, {"volume": new_series(), "sentiment": new_series()})
+
+            observations = [("volume", count)]
+            if scored >= MIN_SENTIMENT_ROWS:
+                observations.append(("sentiment", score_sum / scored))
+
+            for metric, value in observations:
+                baseline = series[metric]["mean"]
+                alert = update_series(series[metric], value, MIN_STD[metric])
+                if alert:
+                    direction, z, cusum = alert
+                    alerts.append([
+                        datetime.now().strftime("%Y-%m-%d %H:%M:%S"), period, dimension, name, metric,
+                        direction, round(value, 4), round(baseline, 4), round(z, 2), round(cusum, 2),
+                    ])
+
+        self.state["last_closed"] = period
+        return alerts
+
+    def _close_ready(self):
+        """Closes every open period whose end the watermark has passed, filling empty gaps."""
+        if self.state["max_event_time"] is None:
+            return []
+        watermark = pd.Timestamp(self.state["max_event_time"]) - self.lateness
+        step = pd.tseries.frequencies.to_offset(PERIOD)
+
+        alerts = []
+        for period in sorted(self.state["open"]):
+            start = pd.Timestamp(period)
+            if start + step > watermark:
+                break
+            if self.state["last_closed"] is not None:
+                gap = pd.Timestamp(self.state["last_closed"]) + step
+                while gap < start:
+                    alerts.extend(self._close_period(gap.strftime(PERIOD_FORMAT), {}))
+                    gap += step
+            alerts.extend(self._close_period(period, self.state["open"].pop(period)))
+        return alerts
+
+    # ----------------------------
+    # Updates
+    # ----------------------------
+    def update(self, df):
+        """
+        Folds the rows of a prepared frame not seen before. Returns a frame
+        of the anomalies raised by periods that closed during this update.
+        """
+        new = df[df["row_id"] > self.state["max_row_id"]].dropna(subset=["timestamp"])
+        if new.empty:
+            return pd.DataFrame([], columns=ANOMALY_COLUMNS)
+
+        self.state["max_row_id"] = int(new["row_id"].max())
+        periods = new["timestamp"].dt.floor(PERIOD).dt.strftime(PERIOD_FORMAT)
+        scores = new["sentiment_score"].astype("float64")
+
+        last_closed = self.state["last_closed"]
+        late = periods <= last_closed if last_closed is not None else pd.Series(False, index=periods.index)
+        if late.any():
+            print(f"Drift monitor: {int(late.sum())} rows from closed periods skipped.")
+
+        on_time = ~late
+        for dimension in DIMENSIONS:
+            grouped = scores[on_time].groupby(
+                [periods[on_time], new.loc[on_time, dimension]], observed=True
+            ).agg(["size", "count", "sum"])
+            for (period, name), (count, scored, score_sum) in grouped.iterrows():
+                totals = self.state["open"].setdefault(period, {})
+                key = f"{dimension}:{name}"
+                prev = totals.get(key, (0, 0, 0.0))
+                totals[key] = (prev[0] + int(count), prev[1] + int(scored), prev[2] + float(score_sum))
+
+        newest = new["timestamp"].max()
+        if self.state["max_event_time"] is None or newest > pd.Timestamp(self.state["max_event_time"]):
+            self.state["max_event_time"] = newest.isoformat()
+
+        return pd.DataFrame(self._close_ready(), columns=ANOMALY_COLUMNS)
+
+
+def append_anomalies(anomalies, path=ANOMALY_FILE):
+    """Appends alerts to anomalies.csv, creating it with a header on first use."""
+    if not os.path.exists(path):
+        anomalies.to_csv(path, index=False)
+    elif not anomalies.empty:
+        anomalies.to_csv(path, mode="a", header=False, index=False)
@@ -0,0 +1,198 @@
+import os
+import json
+import heapq
+import re
+from collections import Counter
+import pandas as pd
+
+# ==================================================
+# TRENDING TERMS (SPACE-SAVING SKETCHES)
+# ==================================================
+# Terms and bigrams from clean_text are counted per topic and event-time
+# day in a Space-Saving sketch of at most SKETCH_CAPACITY counters. Each
+# counter stores (count, error), where count overestimates the true
+# frequency by at most error. Sketches are mergeable, so a micro-batch is
+# folded in by merging its exact counts, and a trailing baseline is the
+# merge of the previous BASELINE_DAYS sketches.
+#
+# Memory is bounded by topics * RETENTION_DAYS * SKETCH_CAPACITY whatever
+# the vocabulary. As with the drift monitor, only rows with a row_id above
+# the highest one already folded are counted, so reruns never double count.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+TRENDING_STATE_FILE = os.path.join(BASE_DIR, "..", "data", "analysis", "trending_state.json")
+TRENDING_FILE = os.path.join(BASE_DIR, "..", "data", "analysis", "trending_terms.csv")
+
+SKETCH_CAPACITY = 200
+RETENTION_DAYS = 14
+BASELINE_DAYS = 7
+OUTPUT_DAYS = 7            # days written to trending_terms.csv
+TOP_K = 10
+MIN_COUNT = 3              # ignore terms seen fewer times on the day
+
+STOPWORDS = set("""
+a about after against all also an and any are as at be been before being
+between but by can could did do does during for from had has have he her
+here his how i if in into is it its just more most new no not now of on
+one only or other our out over says said she so some than that the their
+them then there these they this to too under up us was we were what when
+where which while who why will with would you your amid via
+""".split())
+
+TRENDING_COLUMNS = ["topic", "day", "term", "count", "error", "baseline", "lift", "rank"]
+
+
+class SpaceSaving:
+
+    def __init__(self, capacity=SKETCH_CAPACITY, counters=None):
+        self.capacity = capacity
+        self.counters = {term: tuple(v) for term, v in (counters or {}).items()}
+
+    def min_count(self):
+        # Any term not tracked by a full sketch occurred at most this often
+        if len(self.counters) < self.capacity:
+            return 0
+        return min(count for count, _ in self.counters.values())
+
+    def estimate(self, term):
+        """(count, error) for a term, using the sketch's bound when it is untracked."""
+        if term in self.counters:
+            return self.counters[term]
+        floor = self.min_count()
+        return floor, floor
+
+    def merge(self, other):
+        """Merges another sketch (or exact counts, as a dict of term -> count) in place."""
+        if not isinstance(other, SpaceSaving):
+            # Exact counts: one spare slot so untracked terms count as zero
+            other = SpaceSaving(len(other) + 1, {t: (c, 0) for t, c in other.items()})
+
+        floor_self, floor_other = self.min_count(), other.min_count()
+        combined = {}
+        for term in self.counters.keys() | other.counters.keys():
+            c1, e1 = self.counters.get(term, (floor_self, floor_self))
+            c2, e2 = other.counters.get(term, (floor_other, floor_other))
+            combined[term] = (c1 + c2, e1 + e2)
+
+        kept = heapq.nlargest(self.capacity, combined.items(), key=lambda kv: kv[1][0])
+        self.counters = dict(kept)
+        return self
+
+    def top(self, k):
+        return heapq.nlargest(k, self.counters.items(), key=lambda kv: kv[1][0])
+
+
+def extract_terms(text):
+    """Unigrams and bigrams of a clean_text string, without stopwords."""
+    words = [w for w in re.findall(r"[a-z]+", str(text)) if len(w) > 2]
+    terms = [w for w in words if w not in STOPWORDS]
+    terms += [f"{a} {b}" for a, b in zip(words, words[1:]) if a not in STOPWORDS and b not in STOPWORDS]
+    return terms
+
+
+class TrendingTracker:
+
+    def __init__(self, path=TRENDING_STATE_FILE, capacity=SKETCH_CAPACITY):
+        self.path = path
+        self.capacity = capacity
+        self.max_row_id = -1
+        self.sketches = {}     # topic -> day -> SpaceSaving
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    state = json.load(f)
+                self.max_row_id = state["max_row_id"]
+                self.sketches = {
+                    topic: {day: SpaceSaving(capacity, counters) for day, counters in days.items()}
+                    for topic, days in state["sketches"].items()
+                }
+            except (OSError, ValueError, KeyError):
+                print("Trending state unreadable, starting empty.")
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        state = {
+            "max_row_id": self.max_row_id,
+            "sketches": {
+                topic: {day: sketch.counters for day, sketch in days.items()}
+                for topic, days in self.sketches.items()
+            },
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+
+    def update(self, df):
+        """Folds the clean_text of rows not seen before into their topic-day sketches."""
+        new = df[df["row_id"] > self.max_row_id].dropna(subset=["topic", "timestamp"])
+        if new.empty:
+            return 0
+        self.max_row_id = int(new["row_id"].max())
+
+        days = new["timestamp"].dt.strftime("%Y-%m-%d")
+        for (topic, day), texts in new["clean_text"].groupby([new["topic"], days], observed=True):
+            counts = Counter(term for text in texts.dropna() for term in extract_terms(text))
+            if counts:
+                sketch = self.sketches.setdefault(topic, {}).setdefault(day, SpaceSaving(self.capacity))
+                sketch.merge(counts)
+
+        self.prune()
+        return len(new)
+
+    def prune(self, keep_days=RETENTION_DAYS):
+        all_days = [day for days in self.sketches.values() for day in days]
+        if not all_days:
+            return
+        cutoff = (pd.Timestamp(max(all_days)) - pd.Timedelta(days=keep_days - 1)).strftime("%Y-%m-%d")
+        for topic in list(self.sketches):
+            self.sketches[topic] = {d: s for d, s in self.sketches[topic].items() if d >= cutoff}
+            if not self.sketches[topic]:
+                del self.sketches[topic]
+
+    def baseline(self, topic, day):
+        """Merged sketch of the topic's previous BASELINE_DAYS days and how many of them had data."""
+        start = (pd.Timestamp(day) - pd.Timedelta(days=BASELINE_DAYS)).strftime("%Y-%m-%d")
+        merged = SpaceSaving(self.capacity)
+        n_days = 0
+        for d, sketch in self.sketches.get(topic, {}).items():
+            if start <= d < day:
+                merged.merge(sketch)
+                n_days += 1
+        return merged, n_days
+
+    def trending(self, k=TOP_K):
+        """
+        Top-k terms per topic and day, ranked by lift over the trailing
+        baseline's daily average (by count when there is no baseline yet).
+        """
+        rows = []
+        all_days = [day for days in self.sketches.values() for day in days]
+        if not all_days:
+            return pd.DataFrame(rows, columns=TRENDING_COLUMNS)
+        first = (pd.Timestamp(max(all_days)) - pd.Timedelta(days=OUTPUT_DAYS - 1)).strftime("%Y-%m-%d")
+
+        for topic, days in self.sketches.items():
+            for day, sketch in days.items():
+                if day < first:
+                    continue
+                base, n_days = self.baseline(topic, day)
+                candidates = []
+                for term, (count, error) in sketch.top(self.capacity):
+                    if count < MIN_COUNT:
+                        continue
+                    if n_days:
+                        # Guaranteed count over the baseline's upper bound, so lift is never overstated
+                        baseline = base.estimate(term)[0] / n_days
+                        lift = (count - error + 1) / (baseline + 1)
+                    else:
+                        baseline, lift = float("nan"), float("nan")
+                    candidates.append((term, count, error, baseline, lift))
+
+                key = (lambda c: (c[4], c[1])) if n_days else (lambda c: c[1])
+                for rank, (term, count, error, baseline, lift) in enumerate(
+                        heapq.nlargest(k, candidates, key=key), start=1):
+                    rows.append([topic, day, term, count, error, round(baseline, 2), round(lift, 2), rank])
+
+        return pd.DataFrame(rows, columns=TRENDING_COLUMNS)
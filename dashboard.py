@@ -4,6 +4,7 @@ import plotly.express as px
 from pathlib import Path
 from datetime import timedelta
 import numpy as np
+import sys
 
 # =====================================================
 # PAGE CONFIG
@@ -29,30 +30,68 @@ div[data-testid="stSidebar"] { background-color: #ffffff; }
 # =====================================================
 BASE_DIR = Path(__file__).resolve().parent
 
+sys.path.append(str(BASE_DIR / "src"))
+from schema import load_stage
+from snapshot import current_version, read_snapshot
+
 DATA_FILE     = BASE_DIR / "src" / "send" / "tweets_with_sentiment.csv"
 METRICS_FILE  = BASE_DIR / "data" / "analysis" / "dashboard_metrics.csv"
 INSIGHT_FILE  = BASE_DIR / "data" / "analysis" / "dashboard_insights.csv"
 STATE_FILE    = BASE_DIR / "data" / "analysis" / "genz_state.csv"
+ANOMALY_FILE  = BASE_DIR / "data" / "analysis" / "anomalies.csv"
+TRENDING_FILE = BASE_DIR / "data" / "analysis" / "trending_terms.csv"
+
+SNAPSHOT_TABLES = ["tweets", "metrics", "insights", "state"]
 
 # =====================================================
 # LOAD DATA SAFELY
 # =====================================================
-def load_csv(path, name):
+def load_csv(path, name, reader=pd.read_csv):
     if not path.exists():
         st.error(f"❌ Missing file: {name}")
         st.stop()
-    return pd.read_csv(path)
-
-tweets_df  = load_csv(DATA_FILE, "tweets_with_sentiment.csv")
-metrics_df = load_csv(METRICS_FILE, "dashboard_metrics.csv")
-insight_df = load_csv(INSIGHT_FILE, "dashboard_insights.csv")
-state_df   = load_csv(STATE_FILE, "genz_state.csv")
+    return reader(path)
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def load_snapshot(version):
+    # One memory-mapped copy per snapshot version, shared by every session.
+    # Frames returned from here are read-only: never modify them in place.
+    return read_snapshot(version)
+
+def load_frames():
+    version = current_version()
+    if version:
+        frames = load_snapshot(version)
+        if all(name in frames for name in SNAPSHOT_TABLES):
+            return [frames[name] for name in SNAPSHOT_TABLES]
+
+    # No snapshot published yet: read the CSV outputs directly
+    tweets = load_csv(DATA_FILE, "tweets_with_sentiment.csv", reader=load_stage)
+    tweets = tweets.dropna(subset=["timestamp"])
+    return [
+        tweets,
+        load_csv(METRICS_FILE, "dashboard_metrics.csv"),
+        load_csv(INSIGHT_FILE, "dashboard_insights.csv"),
+        load_csv(STATE_FILE, "genz_state.csv"),
+    ]
+
+def load_optional(name, path):
+    # Tables that only exist once their analysis step has run
+    version = current_version()
+    if version:
+        frames = load_snapshot(version)
+        if name in frames:
+            return frames[name]
+    if path.exists():
+        return pd.read_csv(path)
+    return pd.DataFrame()
+
+tweets_df, metrics_df, insight_df, state_df = load_frames()
+anomaly_df = load_optional("anomalies", ANOMALY_FILE)
+trending_df = load_optional("trending", TRENDING_FILE)
 
 # Cleaning
-tweets_df["timestamp"] = pd.to_datetime(tweets_df["timestamp"], errors="coerce")
-tweets_df = tweets_df.dropna(subset=["timestamp"])
-
-state_df["timestamp"] = pd.to_datetime(state_df["timestamp"], errors="coerce")
+state_df = state_df.assign(timestamp=pd.to_datetime(state_df["timestamp"], errors="coerce"))
 state_df = state_df.dropna(subset=["timestamp"]).sort_values("timestamp")
 
 # =====================================================
@@ -100,7 +139,8 @@ state_df = state_df[state_df["timestamp"] >= cutoff]
 # =====================================================
 # APPLY FILTERS ON TWEETS
 # =====================================================
-df = tweets_df.copy()
+# Filters build new frames; the shared tweets_df itself is never modified
+df = tweets_df
 
 if topics:
     df = df[df["topic"].isin(topics)]
@@ -174,7 +214,7 @@ fig_sent = px.pie(
 
 c1.plotly_chart(fig_sent, use_container_width=True)
 
-topic_score = df.groupby("topic")["sentiment_score"].mean().reset_index()
+topic_score = df.groupby("topic", observed=True)["sentiment_score"].mean().reset_index()
 
 fig_topic = px.bar(
     topic_score.sort_values("sentiment_score"),
@@ -194,8 +234,7 @@ c2.plotly_chart(fig_topic, use_container_width=True)
 # =====================================================
 c3, c4 = st.columns(2)
 
-df["hour"] = df["timestamp"].dt.hour
-hourly = df.groupby("hour").size().reset_index(name="count")
+hourly = df.groupby(df["timestamp"].dt.hour.rename("hour")).size().reset_index(name="count")
 
 fig_hour = px.area(
     hourly,
@@ -207,7 +246,7 @@ fig_hour = px.area(
 
 c3.plotly_chart(fig_hour, use_container_width=True)
 
-source_sent = df.groupby(["source", "sentiment_label"]).size().reset_index(name="count")
+source_sent = df.groupby(["source", "sentiment_label"], observed=True).size().reset_index(name="count")
 
 fig_source = px.treemap(
     source_sent,
@@ -308,6 +347,67 @@ fig_topic_rank = px.bar(
 
 st.plotly_chart(fig_topic_rank, use_container_width=True)
 
+# =====================================================
+# 🆕 TRENDING TERMS (trending_terms.csv)
+# =====================================================
+st.subheader("What People Are Talking About")
+
+if trending_df.empty:
+    st.caption("No trending terms yet.")
+else:
+    t1, t2 = st.columns(2)
+    trend_topics = sorted(trending_df["topic"].unique())
+    trend_topic = t1.selectbox("Trending topic", topics or trend_topics)
+    topic_trends = trending_df[trending_df["topic"] == trend_topic]
+    trend_days = sorted(topic_trends["day"].unique(), reverse=True)
+    trend_day = t2.selectbox("Day", trend_days) if trend_days else None
+    top_terms = topic_trends[topic_trends["day"] == trend_day].sort_values("rank", ascending=False)
+
+    fig_trending = px.bar(
+        top_terms,
+        x="count",
+        y="term",
+        orientation="h",
+        color="lift",
+        hover_data=["baseline", "lift", "error"],
+        title=f"Top Rising Terms — {trend_topic} ({trend_day})",
+        template="plotly_white",
+        color_continuous_scale="Oranges"
+    )
+
+    st.plotly_chart(fig_trending, use_container_width=True)
+
+# =====================================================
+# 🆕 DRIFT ANOMALIES (anomalies.csv)
+# =====================================================
+st.subheader("Sentiment & Volume Drift Alerts")
+
+if anomaly_df.empty:
+    st.caption("No drift detected yet: each topic and source needs a few days of history first.")
+else:
+    alerts = anomaly_df
+    if topics or sources:
+        alerts = alerts[
+            ((alerts["dimension"] == "topic") & alerts["key"].isin(topics))
+            | ((alerts["dimension"] == "source") & alerts["key"].isin(sources))
+        ]
+    alerts = alerts.sort_values(["period", "cusum"], ascending=False)
+
+    fig_alerts = px.scatter(
+        alerts,
+        x="period",
+        y="key",
+        color="direction",
+        symbol="metric",
+        size=alerts["zscore"].abs(),
+        hover_data=["value", "baseline", "zscore", "cusum"],
+        title="CUSUM Change Points by Topic and Source",
+        template="plotly_white"
+    )
+
+    st.plotly_chart(fig_alerts, use_container_width=True)
+    st.dataframe(alerts.head(100), width="stretch")
+
 # =====================================================
 # ROW 4 — METRICS TABLE (dashboard_metrics.csv)
 # =====================================================
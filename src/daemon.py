@@ -0,0 +1,295 @@
+import sys
+import copy
+import json
+import os
+import time
+import argparse
+import pandas as pd
+from pathlib import Path
+from datetime import date, datetime, timedelta
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT / "src" / "send"))
+sys.path.append(str(PROJECT_ROOT / "analysis"))
+
+import analysis
+from ingest import KEYWORDS, RSS_BASE_URL, RateLimiter, fetch_planned, fetch_shard
+from feed_cache import FeedCache
+from schema import assign_row_ids, enforce_schema, load_id_map, load_stage
+from dedup import MinHashIndex
+from snapshot import current_version
+from drift import DRIFT_STATE_FILE, DriftMonitor
+from trending import TRENDING_STATE_FILE, TrendingTracker
+from Sentiment import OUTPUT_FILE as SCORED_FILE, score_frame
+
+# ==================================================
+# CONTINUOUS MICRO-BATCH MODE
+# ==================================================
+# Instead of one daily batch, the daemon polls every shard on a schedule
+# and pushes only the newly published articles through clean -> score ->
+# aggregate. KPI totals are kept as a running summary, so each batch costs
+# time proportional to the new rows, not to the whole history.
+#
+# Event time is the article's publish timestamp. The watermark trails the
+# newest event time seen by ALLOWED_LATENESS_HOURS; anything published
+# before it is treated as late. Late rows are still appended to
+# raw_data.csv, so the next full batch run picks them up, but they are not
+# folded into the live KPIs. The drift monitor and the trending-term
+# sketches see the same on-time rows.
+#
+# A batch that fails (e.g. a CSV locked by Excel) is logged and the daemon
+# keeps polling. Ids are only marked seen once their scored rows are
+# written, so the next poll retries the batch; rows it already stored in
+# raw_data.csv are not appended twice.
+
+RAW_FILE = PROJECT_ROOT / "data" / "raw" / "raw_data.csv"
+PROCESSED_FILE = PROJECT_ROOT / "data" / "processed" / "cleaned_data.csv"
+STREAM_STATE_FILE = PROJECT_ROOT / "data" / "analysis" / "stream_state.json"
+
+POLL_INTERVAL_SEC = 300
+ALLOWED_LATENESS_HOURS = 6
+REQUESTS_PER_SEC = 0.5
+INDEX_SAVE_EVERY = 12      # batches between MinHash index checkpoints
+
+# ==================================================
+# STATE
+# ==================================================
+
+def bootstrap_summary(count_clusters):
+    """KPI summary of the existing scored dataset, counted the way analysis.py counts it."""
+    summary = analysis.empty_summary()
+    if SCORED_FILE.exists():
+        print("Bootstrapping KPI state from the scored dataset...")
+        df = analysis.kpi_frame(load_stage(SCORED_FILE), count_clusters)
+        if not df.empty:
+            summary = analysis.summarize(df)
+    return summary
+
+def load_stream_state(count_clusters=analysis.COUNT_CLUSTERS):
+    if STREAM_STATE_FILE.exists():
+        with open(STREAM_STATE_FILE, encoding="utf-8") as f:
+            state = json.load(f)
+        state["summary"]["hour"] = {int(k): v for k, v in state["summary"]["hour"].items()}
+        if state.get("count_clusters", False) != count_clusters:
+            # Running totals were counted the other way; start them over
+            state["summary"] = bootstrap_summary(count_clusters)
+            state["count_clusters"] = count_clusters
+        return state
+
+    # First start: fold the existing scored dataset in once
+    return {
+        "watermark": None,
+        "max_event_time": None,
+        "summary": bootstrap_summary(count_clusters),
+        "last_group": analysis.last_dominant_group(),
+        "batches": 0,
+        "count_clusters": count_clusters,
+    }
+
+def save_stream_state(state):
+    STREAM_STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = STREAM_STATE_FILE.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, default=str)
+    os.replace(tmp_path, STREAM_STATE_FILE)
+
+# ==================================================
+# HELPERS
+# ==================================================
+
+def to_event_time(values):
+    """Publish timestamps as naive UTC, matching what transform.py stores."""
+    ts = pd.to_datetime(values, errors="coerce", utc=True)
+    return ts.dt.tz_localize(None)
+
+def append_csv(df, path, encoding="utf-8"):
+    """Appends rows under the file's existing header, creating it if needed."""
+    path = Path(path)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        df.to_csv(path, index=False, encoding=encoding)
+        return
+
+    header = list(pd.read_csv(path, nrows=0, encoding="utf-8-sig").columns)
+    if set(header) == set(df.columns):
+        # No BOM when appending, even for files created as utf-8-sig
+        df[header].to_csv(path, mode="a", header=False, index=False, encoding="utf-8")
+    else:
+        # Column layout changed (e.g. an older file still keyed by id); migrate once
+        combined = pd.concat([load_stage(path, assign_ids=True), df], ignore_index=True, sort=False)
+        combined.to_csv(path, index=False, encoding=encoding)
+
+def poll_shards(cache, limiter, seen_ids, base_url=RSS_BASE_URL, plan=False):
+    """Conditional poll of every keyword for today's window; returns unseen rows."""
+    today_dt = date.today()
+    since = (today_dt - timedelta(days=1)).isoformat()
+    until = (today_dt + timedelta(days=1)).isoformat()
+
+    if plan:
+        rows, _ = fetch_planned(KEYWORDS, since, until, base_url, cache=cache, wait=limiter.wait)
+    else:
+        rows = []
+        for kw in KEYWORDS:
+            limiter.wait()
+            try:
+                batch = fetch_shard(kw, since, until, base_url, cache=cache)
+            except Exception as e:
+                print(f"{kw}: fetch failed ({e}), retrying next poll.")
+                continue
+            rows.extend(batch or [])
+    for row in rows:
+        row['run_date'] = today_dt.isoformat()
+
+    if not rows:
+        return pd.DataFrame()
+
+    new_df = pd.DataFrame(rows).drop_duplicates(subset=['id'])
+    return new_df[~new_df['id'].isin(seen_ids)]
+
+# ==================================================
+# MICRO-BATCH
+# ==================================================
+
+def run_micro_batch(state, cache, limiter, index, seen_ids, monitor, tracker, base_url=RSS_BASE_URL,
+                    plan=False):
+    started = time.time()
+    new_df = poll_shards(cache, limiter, seen_ids, base_url, plan)
+
+    if new_df.empty:
+        print(f"[{datetime.now():%H:%M:%S}] No new articles.")
+        return state
+
+    # 1. Raw store keeps every new row, late or not. Every stored row also
+    # gets its row_id now, so the id map (which seen_ids is rebuilt from on
+    # restart) covers late and textless rows too. Rows of a failed batch
+    # that are retried already have one and are not stored again
+    unstored = new_df[new_df['id'].map(load_id_map()).isna()]
+    if not unstored.empty:
+        append_csv(unstored, RAW_FILE)
+        assign_row_ids(unstored['id'].astype(str))
+
+    # 2. Watermark
+    event_time = to_event_time(new_df['timestamp'])
+    watermark = pd.Timestamp(state["watermark"]) if state["watermark"] else None
+    if watermark is not None:
+        on_time = event_time.isna() | (event_time >= watermark)
+    else:
+        on_time = pd.Series(True, index=event_time.index)
+    late_count = int((~on_time).sum())
+
+    batch_max = event_time.max()
+    if pd.notna(batch_max):
+        prev_max = pd.Timestamp(state["max_event_time"]) if state["max_event_time"] else batch_max
+        max_event = max(prev_max, batch_max)
+        state["max_event_time"] = max_event.isoformat()
+        state["watermark"] = (max_event - timedelta(hours=ALLOWED_LATENESS_HOURS)).isoformat()
+
+    batch = new_df[on_time].copy()
+    batch['timestamp'] = event_time[on_time]
+    batch = batch.dropna(subset=['text'])
+
+    if batch.empty:
+        seen_ids.update(new_df['id'])
+        print(f"[{datetime.now():%H:%M:%S}] {len(new_df)} new rows, all late ({late_count}).")
+        return state
+
+    # 3. Clean + score only the new rows
+    batch = enforce_schema(batch)
+    append_csv(batch, PROCESSED_FILE)
+
+    scored = score_frame(batch, index=index)
+    append_csv(scored, SCORED_FILE)
+    seen_ids.update(new_df['id'])
+
+    # 4. Fold into the running KPI summary
+    counted = scored
+    if state["count_clusters"]:
+        # A cluster is counted once, by the row that founded it
+        counted = scored[scored['cluster_id'] == scored['row_id']].copy()
+
+    prepared = analysis.prepare_frame(counted)
+    if not prepared.empty:
+        state["summary"] = analysis.merge_summaries(state["summary"], analysis.summarize(prepared))
+    if state["summary"]["total"]:
+        # genz_state.csv keeps one row per day, as the daily batch writes it;
+        # later batches of the same day only refresh metrics and insights
+        today = date.today().isoformat()
+        record_state = state.get("state_day") != today
+        dominant_group = analysis.write_outputs(state["summary"], state["last_group"], record_state)
+        if record_state:
+            state["last_group"] = dominant_group
+            state["state_day"] = today
+    analysis.update_drift(prepared, monitor)
+    analysis.update_trending(prepared, tracker)
+
+    # New rows become one more part of the dashboard snapshot
+    analysis.publish_dashboard_snapshot(tweets_batch=scored.dropna(subset=['timestamp']))
+
+    state["batches"] += 1
+    freshest = batch['timestamp'].max()
+    lag = (pd.Timestamp.now(tz="UTC").tz_localize(None) - freshest) if pd.notna(freshest) else None
+    print(f"[{datetime.now():%H:%M:%S}] Batch {state['batches']}: {len(batch)} rows scored, "
+          f"{late_count} late, watermark {state['watermark']}, "
+          f"publish->dashboard lag {lag}, took {time.time() - started:.1f}s")
+    return state
+
+def run_daemon(interval=POLL_INTERVAL_SEC, once=False, base_url=RSS_BASE_URL,
+               count_clusters=analysis.COUNT_CLUSTERS, plan=False):
+    print(f"📡 --- India Data Pipeline (daemon, every {interval}s) ---")
+
+    state = load_stream_state(count_clusters)
+    cache = FeedCache()
+    limiter = RateLimiter(REQUESTS_PER_SEC)
+    index = MinHashIndex()
+    seen_ids = set(load_id_map())
+
+    monitor = DriftMonitor(lateness_hours=ALLOWED_LATENESS_HOURS)
+    tracker = TrendingTracker()
+    seed_drift = not os.path.exists(DRIFT_STATE_FILE)
+    seed_trending = not os.path.exists(TRENDING_STATE_FILE)
+    if (seed_drift or seed_trending) and SCORED_FILE.exists():
+        # Seed baselines from history before streaming on top of it
+        history = analysis.kpi_frame(load_stage(SCORED_FILE), count_clusters)
+        if seed_drift:
+            analysis.update_drift(history, monitor)
+        if seed_trending:
+            analysis.update_trending(history, tracker)
+
+    if current_version() is None and SCORED_FILE.exists():
+        analysis.publish_dashboard_snapshot(tweets_df=load_stage(SCORED_FILE).dropna(subset=['timestamp']))
+
+    saved_at = state["batches"]
+    try:
+        while True:
+            try:
+                # A copy, so a failed batch leaves the watermark and totals untouched
+                state = run_micro_batch(copy.deepcopy(state), cache, limiter, index, seen_ids,
+                                        monitor, tracker, base_url, plan)
+            except Exception as e:
+                print(f"[{datetime.now():%H:%M:%S}] Batch failed ({type(e).__name__}: {e}), retrying next poll.")
+            save_stream_state(state)
+            if state["batches"] - saved_at >= INDEX_SAVE_EVERY:
+                index.save()
+                saved_at = state["batches"]
+            if once:
+                break
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("\nStopped by user.")
+    finally:
+        index.save()
+        save_stream_state(state)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Continuous micro-batch pipeline")
+    parser.add_argument("--interval", type=int, default=POLL_INTERVAL_SEC, help="Seconds between polls")
+    parser.add_argument("--once", action="store_true", help="Run a single micro-batch and exit")
+    parser.add_argument("--base-url", default=RSS_BASE_URL, help="Feed endpoint (e.g. a local fixture server)")
+    parser.add_argument("--count-clusters", action="store_true", default=analysis.COUNT_CLUSTERS,
+                        help="Count each near-duplicate story cluster once (same as analysis.py)")
+    parser.add_argument("--plan", action="store_true",
+                        help="Planned OR queries instead of one request per keyword")
+    args = parser.parse_args()
+
+    run_daemon(interval=args.interval, once=args.once, base_url=args.base_url,
+               count_clusters=args.count_clusters, plan=args.plan)
@@ -0,0 +1,137 @@
+import os
+import zlib
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+# ==================================================
+# NEAR-DUPLICATE CLUSTERING (MINHASH + LSH)
+# ==================================================
+# Syndicated stories reach us under slightly different titles, so exact
+# id de-duplication keeps them all. Each headline is turned into a MinHash
+# signature over word shingles of clean_text; LSH banding finds candidate
+# matches without comparing against every stored headline.
+# Rows whose estimated Jaccard similarity clears SIMILARITY_THRESHOLD
+# share a cluster_id (the row_id of the first headline seen in the cluster).
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+INDEX_FILE = PROJECT_ROOT / "data" / "processed" / "minhash_index.npz"
+
+SHINGLE_SIZE = 2           # word bigrams suit short headlines
+NUM_PERM = 128
+BANDS = 32                 # 32 bands x 4 rows -> candidate threshold ~0.42
+ROWS_PER_BAND = NUM_PERM // BANDS
+SIMILARITY_THRESHOLD = 0.6
+
+_PRIME = np.uint64(4294967311)  # smallest prime above 2**32
+_MAX_HASH = np.uint32(0xFFFFFFFF)
+
+# Fixed seed so signatures stay comparable across runs
+_rng = np.random.RandomState(42)
+_PERM_A = _rng.randint(1, 2**32 - 1, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, 2**32 - 1, size=NUM_PERM, dtype=np.uint64)
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    words = str(text).split() if not pd.isna(text) else []
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash_signature(text):
+    """128 uint32 minimums of universal hashes over the text's shingles."""
+    tokens = shingles(text)
+    if not tokens:
+        return np.full(NUM_PERM, _MAX_HASH, dtype=np.uint32)
+
+    hashes = np.array([zlib.crc32(t.encode("utf-8")) for t in tokens], dtype=np.uint64)
+    # (a * x + b) mod p for every (permutation, shingle) pair; fits in uint64
+    permuted = (np.outer(_PERM_A, hashes) + _PERM_B[:, None]) % _PRIME
+    return permuted.min(axis=1).astype(np.uint32)
+
+
+class MinHashIndex:
+    """
+    Persistent LSH index of every headline signature seen so far.
+    New rows are appended on each run; nothing already indexed is rehashed.
+    """
+
+    def __init__(self, path=INDEX_FILE):
+        self.path = Path(path)
+        self.row_ids = []
+        self.cluster_ids = []
+        self.signatures = []
+        self.cluster_of = {}
+        self.buckets = {}
+
+        if self.path.exists():
+            stored = np.load(self.path)
+            for row_id, cluster_id, sig in zip(stored["row_ids"], stored["cluster_ids"], stored["signatures"]):
+                self._add(int(row_id), int(cluster_id), sig)
+
+    def _band_keys(self, sig):
+        for band in range(BANDS):
+            start = band * ROWS_PER_BAND
+            yield band, sig[start:start + ROWS_PER_BAND].tobytes()
+
+    def _add(self, row_id, cluster_id, sig):
+        pos = len(self.row_ids)
+        self.row_ids.append(row_id)
+        self.cluster_ids.append(cluster_id)
+        self.signatures.append(sig)
+        self.cluster_of[row_id] = cluster_id
+        if (sig == _MAX_HASH).all():
+            return  # empty text, never a candidate for anything
+        for key in self._band_keys(sig):
+            self.buckets.setdefault(key, []).append(pos)
+
+    def query(self, sig):
+        """Best matching cluster for a signature, or None below the threshold."""
+        candidates = set()
+        for key in self._band_keys(sig):
+            candidates.update(self.buckets.get(key, ()))
+
+        best_cluster, best_score = None, SIMILARITY_THRESHOLD
+        for pos in candidates:
+            score = float(np.mean(self.signatures[pos] == sig))
+            if score >= best_score:
+                best_cluster, best_score = self.cluster_ids[pos], score
+        return best_cluster
+
+    def assign(self, row_id, text):
+        if row_id in self.cluster_of:
+            return self.cluster_of[row_id]
+
+        sig = minhash_signature(text)
+        cluster_id = self.query(sig) if not (sig == _MAX_HASH).all() else None
+        if cluster_id is None:
+            cluster_id = row_id
+        self._add(row_id, cluster_id, sig)
+        return cluster_id
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp.npz")
+        np.savez_compressed(
+            tmp_path,
+            row_ids=np.array(self.row_ids, dtype=np.int64),
+            cluster_ids=np.array(self.cluster_ids, dtype=np.int64),
+            signatures=np.array(self.signatures, dtype=np.uint32).reshape(-1, NUM_PERM),
+        )
+        os.replace(tmp_path, self.path)
+
+
+def assign_clusters(df, text_col="clean_text", id_col="row_id", index_path=INDEX_FILE, index=None):
+    """
+    Returns a cluster_id Series aligned with df. Without an index the stored
+    one is loaded, updated and saved; a caller passing its own long-lived
+    index decides when to save it.
+    """
+    owns_index = index is None
+    if owns_index:
+        index = MinHashIndex(index_path)
+    clusters = [index.assign(int(row_id), text) for row_id, text in zip(df[id_col], df[text_col])]
+    if owns_index:
+        index.save()
+    return pd.Series(clusters, index=df.index, dtype="int64")
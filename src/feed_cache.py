@@ -0,0 +1,129 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+import requests
+from pathlib import Path
+
+# ==================================================
+# CONDITIONAL FEED FETCHING + RAW RESPONSE CACHE
+# ==================================================
+# Each shard URL remembers the ETag / Last-Modified the server sent last
+# time and asks again with If-None-Match / If-Modified-Since. A 304 means
+# nothing changed, so the caller can skip parsing altogether.
+# Response bodies are kept gzip-compressed on disk so reruns and tests can
+# replay feeds offline; entries older than the TTL are evicted when the
+# cache opens and then at most every EVICT_EVERY_SEC while storing, so a
+# long-lived cache (the daemon's) drops the bodies of past date windows.
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+CACHE_DIR = PROJECT_ROOT / "data" / "raw" / "feed_cache"
+CACHE_TTL_HOURS = 24
+EVICT_EVERY_SEC = 3600
+INDEX_NAME = "index.json"
+USER_AGENT = "Mozilla/5.0"
+REQUEST_TIMEOUT = 30
+
+NOT_MODIFIED = 304
+
+
+class FeedCache:
+
+    def __init__(self, cache_dir=CACHE_DIR, ttl_hours=CACHE_TTL_HOURS):
+        self.cache_dir = Path(cache_dir)
+        self.ttl_seconds = ttl_hours * 3600
+        self.index_path = self.cache_dir / INDEX_NAME
+        self.lock = threading.Lock()
+        self.last_evicted = 0.0
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self.index = {}
+        if self.index_path.exists():
+            try:
+                with open(self.index_path, encoding="utf-8") as f:
+                    self.index = json.load(f)
+            except (OSError, ValueError):
+                print("Feed cache index unreadable, starting empty.")
+        self.evict_expired()
+
+    # ----------------------------
+    # Storage
+    # ----------------------------
+    def _body_path(self, url):
+        return self.cache_dir / (hashlib.sha1(url.encode("utf-8")).hexdigest() + ".xml.gz")
+
+    def _save_index(self):
+        tmp_path = self.index_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self.index_path)
+
+    def evict_expired(self):
+        cutoff = time.time() - self.ttl_seconds
+        with self.lock:
+            self.last_evicted = time.time()
+            expired = [url for url, meta in self.index.items() if meta["fetched_at"] < cutoff]
+            for url in expired:
+                self._body_path(url).unlink(missing_ok=True)
+                del self.index[url]
+            if expired:
+                self._save_index()
+        return len(expired)
+
+    def read_body(self, url):
+        path = self._body_path(url)
+        if url not in self.index or not path.exists():
+            return None
+        with gzip.open(path, "rb") as f:
+            return f.read()
+
+    def store(self, url, body, etag=None, modified=None):
+        path = self._body_path(url)
+        tmp_path = path.with_suffix(".tmp")
+        with gzip.open(tmp_path, "wb") as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+
+        with self.lock:
+            self.index[url] = {"etag": etag, "modified": modified, "fetched_at": time.time()}
+            self._save_index()
+
+        if time.time() - self.last_evicted >= EVICT_EVERY_SEC:
+            self.evict_expired()
+
+    # ----------------------------
+    # Fetching
+    # ----------------------------
+    def fetch(self, url, offline=False):
+        """
+        Returns (status, body). Offline mode replays the cached body (status
+        200) or returns (None, None) when the URL was never cached. Online
+        mode returns (304, None) when the server reports no change.
+        """
+        if offline:
+            body = self.read_body(url)
+            return (200, body) if body is not None else (None, None)
+
+        headers = {"User-Agent": USER_AGENT}
+        meta = self.index.get(url)
+        if meta and self._body_path(url).exists():
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("modified"):
+                headers["If-Modified-Since"] = meta["modified"]
+
+        response = requests.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+
+        if response.status_code == NOT_MODIFIED and url in self.index:
+            with self.lock:
+                self.index[url]["fetched_at"] = time.time()
+                self._save_index()
+            return NOT_MODIFIED, None
+
+        response.raise_for_status()
+        self.store(url, response.content,
+                   etag=response.headers.get("ETag"),
+                   modified=response.headers.get("Last-Modified"))
+        return response.status_code, response.content
@@ -3,11 +3,299 @@ import pandas as pd
 import time
 import random
 import html
+import json
+import os
+import re
+import argparse
+import threading
+from collections import Counter
 from pathlib import Path
 from urllib.parse import quote
 from datetime import date, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-def run_dynamic_bulk_ingest():
+from feed_cache import FeedCache, NOT_MODIFIED
+
+RSS_BASE_URL = "https://news.google.com/rss/search"
+
+# HIGH-DENSITY KEYWORDS
+KEYWORDS = [
+    "GenZ India", "Indian Youth", "Student Life India", "Instagram India", 
+    "Twitter India trends", "India Tech Startups", "UPSC Aspirants", 
+    "CBSE Exams", "Indian Gamers", "Bollywood GenZ", "India Fashion Trends",
+    "Gig Economy India", "Digital India", "India Entrepreneurship", 
+    "Mental Health India", "College Festivals India", "India Skill Development"
+]
+
+RAW_FILE = Path(__file__).resolve().parent.parent / "data" / "raw" / "raw_data.csv"
+BACKFILL_DIR = Path(__file__).resolve().parent.parent / "data" / "raw" / "backfill"
+CHECKPOINT_NAME = "checkpoint.json"
+
+def build_feed_url(kw, target_day, next_day, base_url=RSS_BASE_URL):
+    # Construct dynamic query
+    query_str = f"{kw} after:{target_day} before:{next_day}"
+    encoded_query = quote(query_str)
+    return f"{base_url}?q={encoded_query}&hl=en-IN&gl=IN&ceid=IN:en"
+
+def fetch_entries(rss_url, cache=None, offline=False, replay_unchanged=False):
+    """
+    Parsed entries of one feed URL, or None when there is no response to
+    parse. That is different from a feed with zero entries.
+
+    With a FeedCache the request is conditional: an unchanged feed (304)
+    returns None without being parsed, unless replay_unchanged asks for the
+    cached copy instead. Offline mode replays the cached response and
+    returns None for a URL that was never cached.
+    """
+    if cache is None:
+        # User-Agent to prevent bot detection
+        feed = feedparser.parse(rss_url, agent="Mozilla/5.0")
+        if feed.get("bozo") and "status" not in feed:
+            return None  # request never got a response
+    else:
+        status, body = cache.fetch(rss_url, offline=offline)
+        if status == NOT_MODIFIED and replay_unchanged:
+            body = cache.read_body(rss_url)
+        if body is None:
+            return None
+        feed = feedparser.parse(body)
+    return feed.entries
+
+def entry_text(entry):
+    return html.unescape(entry.title).split(' - ')[0]
+
+ROW_COLUMNS = ['id', 'topic', 'text', 'timestamp', 'run_date', 'source']
+
+def entry_row(entry, kw, target_day):
+    return {
+        'id': entry.id,
+        'topic': kw,
+        'text': entry_text(entry),
+        'timestamp': entry.published,
+        'run_date': target_day, # Tagging when this was fetched
+        'source': entry.source.title if hasattr(entry, 'source') else "News"
+    }
+
+def fetch_shard(kw, target_day, next_day, base_url=RSS_BASE_URL, cache=None, offline=False,
+                replay_unchanged=False):
+    """
+    Fetches one keyword shard for one day window and returns its rows, or
+    None when there was no response (unchanged feed, or not cached offline).
+    """
+    rss_url = build_feed_url(kw, target_day, next_day, base_url)
+    entries = fetch_entries(rss_url, cache, offline, replay_unchanged)
+    if entries is None:
+        return None
+    return [entry_row(entry, kw, target_day) for entry in entries]
+
+# ==================================================
+# QUERY PLANNER
+# ==================================================
+# One request per keyword does not scale with the keyword list. The planner
+# packs keywords into OR queries such as "(GenZ India) OR (Indian Youth)"
+# of at most MAX_QUERY_CHARS, and attributes each returned entry to the
+# first keyword, in keyword order, whose words all appear in its title.
+#
+# News search often returns headlines that contain none of the keyword's
+# words, so a keyword is only grouped once its own per-keyword results have
+# matched their titles reliably (TITLE_MATCH_RATE over at least
+# MIN_TITLE_SAMPLES entries). Groups are also kept to GROUP_RESULT_BUDGET
+# expected entries, from each keyword's average result count, since a feed
+# returns at most FEED_RESULT_CAP entries.
+#
+# Nothing is guessed: if a grouped query returns an entry no keyword
+# matches, the group is re-queried one keyword at a time and its keywords
+# have to qualify again. A group that fills the result cap is split in half
+# and its volume estimates are scaled up so later plans do not pack it
+# again. Per-keyword statistics are kept in data/raw/query_plan.json.
+#
+# On the checked-in raw_data.csv no keyword's titles qualify, so planning
+# is opt-in (--plan); `ingest.py --check-attribution` replays a dataset to
+# show whether it would save requests.
+
+FEED_RESULT_CAP = 100
+GROUP_RESULT_BUDGET = 80
+MAX_QUERY_CHARS = 120
+TITLE_MATCH_RATE = 0.95
+MIN_TITLE_SAMPLES = 30
+PLAN_FILE = Path(__file__).resolve().parent.parent / "data" / "raw" / "query_plan.json"
+
+def group_query(group):
+    if len(group) == 1:
+        return group[0]
+    return " OR ".join(f"({kw})" for kw in group)
+
+def plan_queries(keywords, keyword_stats=None, max_chars=MAX_QUERY_CHARS):
+    """
+    Packs keywords, in order, into groups whose OR query fits in max_chars.
+    With keyword_stats ({kw: [title matches, entries, fetches]}), only
+    keywords with reliable titles are grouped, within GROUP_RESULT_BUDGET
+    expected entries; every other keyword is queried on its own.
+    """
+    groups, current, current_volume = [], [], 0.0
+    for kw in keywords:
+        volume = 0.0
+        if keyword_stats is not None:
+            matched, seen, fetches = keyword_stats.get(kw, (0, 0, 0))
+            if seen < MIN_TITLE_SAMPLES or matched / seen < TITLE_MATCH_RATE:
+                groups.append([kw])
+                continue
+            volume = seen / fetches
+        if current and (len(group_query(current + [kw])) > max_chars
+                        or current_volume + volume > GROUP_RESULT_BUDGET):
+            groups.append(current)
+            current, current_volume = [], 0.0
+        current.append(kw)
+        current_volume += volume
+    if current:
+        groups.append(current)
+    return groups
+
+def load_plan(keywords, path=PLAN_FILE):
+    """Saved per-keyword statistics, {kw: [title matches, entries, fetches]}."""
+    if path.exists():
+        try:
+            with open(path, encoding="utf-8") as f:
+                saved = json.load(f)
+            # Older plans were a bare list of groups without statistics
+            if isinstance(saved, dict):
+                return {kw: list(v) for kw, v in saved["keyword_stats"].items() if kw in keywords}
+        except (OSError, ValueError, KeyError):
+            print("Query plan unreadable, planning from scratch.")
+    return {}
+
+def save_plan(keyword_stats, path=PLAN_FILE):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"keyword_stats": keyword_stats}, f, indent=1)
+    os.replace(tmp_path, path)
+
+def _words(text):
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+def _stem(word):
+    return word[:-1] if len(word) > 3 and word.endswith("s") else word
+
+def keyword_match(kw, title_words, compact_title):
+    """Fraction of the keyword's words found in a title ("genz" also matches "Gen Z")."""
+    tokens = [_stem(w) for w in _words(kw)]
+    hits = sum(
+        1 for t in tokens
+        if any(w.startswith(t) for w in title_words) or (len(t) > 3 and t in compact_title)
+    )
+    return hits / len(tokens) if tokens else 0.0
+
+def title_matches(kw, title):
+    title_words = _words(title)
+    return keyword_match(kw, title_words, "".join(title_words)) == 1.0
+
+def attribute_keyword(title, group):
+    """The keyword of a query group an entry belongs to, or None when no keyword fully matches its title."""
+    if len(group) == 1:
+        return group[0]
+    return next((kw for kw in group if title_matches(kw, title)), None)
+
+def fetch_planned(keywords, target_day, next_day, base_url=RSS_BASE_URL, cache=None,
+                  offline=False, wait=None, plan_path=PLAN_FILE):
+    """
+    Fetches every keyword through the query plan and returns (rows, requests).
+    Each entry yields one row, for the first keyword in `keywords` it was
+    attributed to. `wait` is called before each request (e.g. a RateLimiter's wait).
+    """
+    stats = load_plan(keywords, plan_path)
+    order = {kw: i for i, kw in enumerate(keywords)}
+    pending = plan_queries(keywords, stats)
+    best = {}              # entry id -> (keyword order, row)
+    requests_made = 0
+
+    while pending:
+        group = pending.pop(0)
+        if wait is not None:
+            wait()
+        query = group_query(group)
+        try:
+            entries = fetch_entries(build_feed_url(query, target_day, next_day, base_url), cache, offline)
+        except Exception as e:
+            print(f"{query}: fetch failed ({e}), retrying next run.")
+            continue
+        requests_made += 1
+        if entries is None:
+            # Unchanged since the last poll, or not cached offline
+            continue
+
+        if len(entries) >= FEED_RESULT_CAP and len(group) > 1:
+            # Results were probably truncated: re-query each half instead
+            half = len(group) // 2
+            pending[:0] = [group[:half], group[half:]]
+            expected = sum(stats[kw][1] / stats[kw][2] for kw in group)
+            scale = FEED_RESULT_CAP / expected if expected else 1.0
+            for kw in group:
+                matched, seen, fetches = stats[kw]
+                stats[kw] = [round(matched * scale, 1), round(seen * scale, 1), fetches]
+            print(f"Query for {len(group)} keywords hit the {FEED_RESULT_CAP}-result cap, splitting.")
+            continue
+
+        attributed = [(entry, attribute_keyword(entry_text(entry), group)) for entry in entries]
+        if any(kw is None for _, kw in attributed):
+            # Titles that name no keyword: ask each keyword on its own
+            pending[:0] = [[kw] for kw in group]
+            for kw in group:
+                stats[kw] = [0, 0, 0]
+            print(f"Query for {len(group)} keywords returned unmatched titles, re-querying per keyword.")
+            continue
+
+        if len(group) == 1:
+            kw = group[0]
+            matched, seen, fetches = stats.get(kw, (0, 0, 0))
+            matched += sum(title_matches(kw, entry_text(entry)) for entry in entries)
+            stats[kw] = [matched, seen + len(entries), fetches + 1]
+
+        for entry, kw in attributed:
+            if entry.id not in best or order[kw] < best[entry.id][0]:
+                best[entry.id] = (order[kw], entry_row(entry, kw, target_day))
+
+    if not offline:
+        save_plan(stats, plan_path)
+    return [row for _, row in best.values()], requests_made
+
+def check_attribution(raw_path=RAW_FILE, keywords=KEYWORDS):
+    """
+    Replays a raw dataset through the planner: every keyword's rows stand in
+    for its per-keyword results, first to learn title statistics, then as the
+    union a grouped query would return. Prints how many rows get their
+    original topic back, for the learned plan and for grouping every keyword.
+    """
+    df = pd.read_csv(raw_path, encoding='utf-8-sig').drop_duplicates(subset=['id'])
+    df = df[df['topic'].isin(keywords)]
+    by_topic = {kw: df.loc[df['topic'] == kw, 'text'].astype(str).tolist() for kw in keywords}
+
+    stats = {}
+    for kw, titles in by_topic.items():
+        stats[kw] = [sum(title_matches(kw, t) for t in titles), len(titles), 1]
+
+    def replay(group):
+        """Outcome of fetching one group the way fetch_planned would."""
+        found = [(kw, attribute_keyword(t, group)) for kw in group for t in by_topic[kw]]
+        outcome = Counter(requests=1)
+        if len(group) > 1 and len(found) >= FEED_RESULT_CAP:
+            half = len(group) // 2
+            return outcome + replay(group[:half]) + replay(group[half:])
+        if any(got is None for _, got in found):
+            # Re-queried per keyword, which returns the true topic
+            outcome.update(requests=len(group), requeried=len(found))
+            return outcome
+        outcome.update(correct=sum(kw == got for kw, got in found), wrong=sum(kw != got for kw, got in found))
+        return outcome
+
+    print(f"per keyword: {len(keywords)} requests")
+    for label, groups in (("learned plan", plan_queries(keywords, stats)), ("all grouped", plan_queries(keywords))):
+        totals = sum((replay(group) for group in groups), Counter())
+        print(f"{label}: {len(groups)} groups, {totals['requests']} requests, "
+              f"{totals['correct']} rows attributed correctly, {totals['wrong']} wrongly, "
+              f"{totals['requeried']} re-queried per keyword (of {len(df)}).")
+
+def run_dynamic_bulk_ingest(offline=False, plan=False):
     # 1. SETUP DYNAMIC DATES
     # Automatically gets yesterday's date for a rolling 24-hour window
     today_dt = date.today()
@@ -32,47 +320,36 @@ def run_dynamic_bulk_ingest():
 
 
     # 3. HIGH-DENSITY KEYWORDS
-    keywords = [
-        "GenZ India", "Indian Youth", "Student Life India", "Instagram India", 
-        "Twitter India trends", "India Tech Startups", "UPSC Aspirants", 
-        "CBSE Exams", "Indian Gamers", "Bollywood GenZ", "India Fashion Trends",
-        "Gig Economy India", "Digital India", "India Entrepreneurship", 
-        "Mental Health India", "College Festivals India", "India Skill Development"
-    ]
+    keywords = KEYWORDS
     
+    cache = FeedCache()
     all_new_data = []
     print(f"📡 --- India Data Pipeline ---")
     print(f"Window: {target_day} to {next_day}")
-    print(f"Starting fetch for {len(keywords)} shards...")
 
-    for kw in keywords:
-        # Construct dynamic query
-        query_str = f"{kw} after:{target_day} before:{next_day}"
-        encoded_query = quote(query_str)
-        rss_url = f"https://news.google.com/rss/search?q={encoded_query}&hl=en-IN&gl=IN&ceid=IN:en"
-        
-        print(f"🔍 Fetching {kw}...", end=" ", flush=True)
-        
-        # User-Agent to prevent bot detection
-        feed = feedparser.parse(rss_url, agent="Mozilla/5.0")
-        
-        batch = []
-        for entry in feed.entries:
-            clean_text = html.unescape(entry.title).split(' - ')[0]
-            batch.append({
-                'id': entry.id,
-                'topic': kw,
-                'text': clean_text,
-                'timestamp': entry.published,
-                'run_date': target_day, # Tagging when this was fetched
-                'source': entry.source.title if hasattr(entry, 'source') else "News"
-            })
-        
-        all_new_data.extend(batch)
-        print(f"Added {len(batch)} rows.")
-        
-        # Short ethical delay
-        time.sleep(random.uniform(1.2, 2.5))
+    if plan:
+        print(f"Starting planned fetch for {len(keywords)} keywords...")
+        # Short ethical delay between requests
+        wait = None if offline else (lambda: time.sleep(random.uniform(1.2, 2.5)))
+        all_new_data, requests_made = fetch_planned(keywords, target_day, next_day,
+                                                    cache=cache, offline=offline, wait=wait)
+        print(f"Added {len(all_new_data)} rows with {requests_made} requests.")
+    else:
+        print(f"Starting fetch for {len(keywords)} shards...")
+        for kw in keywords:
+            print(f"🔍 Fetching {kw}...", end=" ", flush=True)
+
+            try:
+                batch = fetch_shard(kw, target_day, next_day, cache=cache, offline=offline) or []
+                all_new_data.extend(batch)
+                print(f"Added {len(batch)} rows.")
+            except Exception as e:
+                # Keep the shards already fetched; this one is retried next run
+                print(f"fetch failed ({e}).")
+
+            # Short ethical delay
+            if not offline:
+                time.sleep(random.uniform(1.2, 2.5))
 
     # 4. SAVE & DEDUPLICATE (Append Mode)
     if all_new_data:
@@ -96,5 +373,180 @@ def run_dynamic_bulk_ingest():
     else:
         print(f"No new data found for {target_day}.")
 
+# ==================================================
+# HISTORICAL BACKFILL
+# ==================================================
+
+class RateLimiter:
+    """Spaces requests at least 1/rate seconds apart across all worker threads."""
+
+    def __init__(self, requests_per_sec):
+        self.interval = 1.0 / requests_per_sec
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        time.sleep(max(0.0, slot - now))
+
+def load_checkpoint(path):
+    if path.exists():
+        with open(path, encoding="utf-8") as f:
+            return set(json.load(f))
+    return set()
+
+def save_checkpoint(path, done):
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(sorted(done), f, indent=0)
+    os.replace(tmp_path, path)
+
+def backfill_units(start_day, end_day, keywords):
+    """All (day, keyword) pairs for the inclusive date range."""
+    day = date.fromisoformat(start_day)
+    last = date.fromisoformat(end_day)
+    units = []
+    while day <= last:
+        units.extend((day.isoformat(), kw) for kw in keywords)
+        day += timedelta(days=1)
+    return units
+
+def unit_key(day, kw):
+    return f"{day}|{kw}"
+
+def partition_path(out_dir, day, kw):
+    slug = re.sub(r"[^a-z0-9]+", "_", kw.lower()).strip("_")
+    return out_dir / day / f"{slug}.csv"
+
+def run_backfill(start_day, end_day, keywords=None, workers=4, requests_per_sec=0.5,
+                 base_url=RSS_BASE_URL, out_dir=BACKFILL_DIR, offline=False):
+    """
+    Re-fetches history for a date range, one work unit per (day, keyword).
+    Each finished unit is written to data/raw/backfill/<day>/<keyword>.csv and
+    recorded in the checkpoint, so an interrupted run resumes where it stopped.
+    """
+    keywords = keywords or KEYWORDS
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    checkpoint_path = out_dir / CHECKPOINT_NAME
+
+    done = load_checkpoint(checkpoint_path)
+    units = backfill_units(start_day, end_day, keywords)
+    pending = [u for u in units if unit_key(*u) not in done]
+
+    print(f"📡 --- India Data Backfill ---")
+    print(f"Window: {start_day} to {end_day}, {len(keywords)} keywords")
+    print(f"{len(units) - len(pending)} of {len(units)} units already done, {len(pending)} to fetch.")
+
+    limiter = RateLimiter(requests_per_sec)
+    cache = FeedCache()
+    checkpoint_lock = threading.Lock()
+
+    def run_unit(day, kw):
+        if not offline:
+            limiter.wait()
+        next_day = (date.fromisoformat(day) + timedelta(days=1)).isoformat()
+        # A 304 here means the cached body is current, so replay it: the
+        # partition may never have been written (e.g. a crash after caching)
+        batch = fetch_shard(kw, day, next_day, base_url, cache=cache, offline=offline,
+                            replay_unchanged=True)
+        if batch is None:
+            # Nothing to write (offline and never cached): leave the unit pending
+            return None
+
+        # Written even when empty, so every checkpointed unit has its partition
+        file_path = partition_path(out_dir, day, kw)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = file_path.with_suffix(".tmp")
+        pd.DataFrame(batch, columns=ROW_COLUMNS).to_csv(tmp_path, index=False, encoding='utf-8-sig')
+        os.replace(tmp_path, file_path)
+
+        with checkpoint_lock:
+            done.add(unit_key(day, kw))
+            save_checkpoint(checkpoint_path, done)
+        return len(batch)
+
+    failed = 0
+    skipped = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_unit, day, kw): (day, kw) for day, kw in pending}
+        for future in as_completed(futures):
+            day, kw = futures[future]
+            try:
+                added = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"{day} {kw}: FAILED ({e}), will retry on next run.")
+                continue
+            if added is None:
+                skipped += 1
+                print(f"{day} {kw}: no cached response, left pending.")
+            else:
+                print(f"{day} {kw}: added {added} rows.")
+
+    fetched = len(pending) - failed - skipped
+    print(f"\nBackfill finished: {fetched} units fetched, {failed} failed, {skipped} left pending.")
+    print(f"Partitions stored in: {out_dir}")
+
+def merge_backfill(out_dir=BACKFILL_DIR, raw_path=RAW_FILE):
+    """
+    Folds every finished backfill partition into raw_data.csv with the usual
+    id dedup, so transform.py picks the history up. Rows already in the raw
+    store win, which makes re-merging the same partitions a no-op.
+    """
+    out_dir = Path(out_dir)
+    raw_path = Path(raw_path)
+    partitions = sorted(out_dir.glob("*/*.csv"))
+    if not partitions:
+        print(f"No backfill partitions in {out_dir}.")
+        return 0
+
+    frames = [pd.read_csv(p, encoding='utf-8-sig', dtype={'id': str}) for p in partitions]
+    if raw_path.exists():
+        frames.insert(0, pd.read_csv(raw_path, encoding='utf-8-sig', dtype={'id': str}))
+        before = len(frames[0].drop_duplicates(subset=['id']))
+    else:
+        before = 0
+
+    final_df = pd.concat(frames, ignore_index=True, sort=False).drop_duplicates(subset=['id'])
+    added = len(final_df) - before
+
+    raw_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = raw_path.with_suffix(".tmp")
+    final_df.to_csv(tmp_path, index=False, encoding='utf-8-sig')
+    os.replace(tmp_path, raw_path)
+
+    print(f"Merged {len(partitions)} partitions: {added} new rows, {len(final_df)} total in {raw_path}")
+    return added
+
 if __name__ == "__main__":
-    run_dynamic_bulk_ingest()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Google News RSS ingest")
+    parser.add_argument("--backfill", nargs=2, metavar=("START", "END"),
+                        help="Backfill an inclusive YYYY-MM-DD date range instead of yesterday")
+    parser.add_argument("--keywords", nargs="+", help="Keyword subset for the backfill")
+    parser.add_argument("--merge", action="store_true",
+                        help="Fold finished backfill partitions into raw_data.csv (after --backfill, if given)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=0.5, help="Global requests per second")
+    parser.add_argument("--base-url", default=RSS_BASE_URL, help="Feed endpoint (e.g. a local fixture server)")
+    parser.add_argument("--offline", action="store_true", help="Replay cached feed responses without network")
+    parser.add_argument("--plan", action="store_true",
+                        help="Planned OR queries instead of one request per keyword")
+    parser.add_argument("--check-attribution", action="store_true",
+                        help="Replay raw_data.csv through the query planner and report topic agreement")
+    args = parser.parse_args()
+
+    if args.check_attribution:
+        check_attribution()
+    elif args.backfill:
+        run_backfill(args.backfill[0], args.backfill[1], args.keywords,
+                     workers=args.workers, requests_per_sec=args.rate,
+                     base_url=args.base_url, offline=args.offline)
+    elif not args.merge:
+        run_dynamic_bulk_ingest(offline=args.offline, plan=args.plan)
+
+    if args.merge:
+        merge_backfill()
\ No newline at end of file
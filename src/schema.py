@@ -0,0 +1,211 @@
+import os
+import re
+import pandas as pd
+from pathlib import Path
+
+try:
+    import pyarrow  # noqa: F401
+    TEXT_DTYPE = "string[pyarrow]"
+except ImportError:
+    TEXT_DTYPE = object
+
+# ==================================================
+# SHARED ROW SCHEMA
+# ==================================================
+# Every stage loads its CSV through here so the in-memory frame is compact:
+#   - low-cardinality text columns become pandas categoricals
+#   - score columns become float32, timestamps become datetime64
+#   - headline text is held as Arrow strings when pyarrow is installed
+#   - the long base64 feed `id` is replaced by an int64 `row_id`
+#   - derived columns (clean_text) are never stored or loaded; stages that
+#     need them rebuild them from `text` with clean_text()
+# The original id string only lives in data/raw/raw_data.csv, and
+# data/raw/id_map.csv is the dictionary that links the two. A checkout
+# without the id map builds it once from raw_data.csv, so the stage files
+# that still carry the legacy `id` column can be read.
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+ID_MAP_FILE = PROJECT_ROOT / "data" / "raw" / "id_map.csv"
+RAW_FILE = PROJECT_ROOT / "data" / "raw" / "raw_data.csv"
+
+CATEGORY_COLUMNS = ["topic", "source", "sentiment_label", "run_date"]
+FLOAT_COLUMNS = ["sentiment_score", "sent_pos", "sent_neu", "sent_neg", "sent_confidence"]
+TEXT_COLUMNS = ["text"]
+DERIVED_COLUMNS = ["clean_text"]
+TIMESTAMP_COLUMN = "timestamp"
+ID_COLUMN = "id"
+ROW_ID_COLUMN = "row_id"
+
+# ==================================================
+# ID DICTIONARY
+# ==================================================
+
+# path -> (file size when loaded, id map); long-running callers such as the
+# daemon then only pay for new ids instead of re-reading the whole map
+_id_map_cache = {}
+
+def load_id_map(path=ID_MAP_FILE):
+    """Returns the persisted {id string -> row_id} dictionary."""
+    path = Path(path)
+    if not path.exists():
+        return {}
+    size = path.stat().st_size
+    cached = _id_map_cache.get(path)
+    if cached and cached[0] == size:
+        return cached[1]
+    df = pd.read_csv(path, dtype={ID_COLUMN: str, ROW_ID_COLUMN: "int64"})
+    id_map = dict(zip(df[ID_COLUMN], df[ROW_ID_COLUMN].astype(int)))
+    _id_map_cache[path] = (size, id_map)
+    return id_map
+
+
+def bootstrap_id_map(path=ID_MAP_FILE, raw_path=RAW_FILE):
+    """
+    Creates a missing id map by numbering the ids of raw_data.csv in file
+    order. The map is written to a temporary file and hard-linked into
+    place, which fails if another process created it first, so an existing
+    map is never overwritten.
+    """
+    path = Path(path)
+    if path.exists() or not Path(raw_path).exists():
+        return
+    ids = pd.read_csv(raw_path, encoding="utf-8-sig", usecols=[ID_COLUMN], dtype={ID_COLUMN: str})[ID_COLUMN]
+    ids = pd.unique(ids.dropna())
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    pd.DataFrame({ID_COLUMN: ids, ROW_ID_COLUMN: range(len(ids))}).to_csv(tmp_path, index=False)
+    try:
+        os.link(tmp_path, path)
+        print(f"Built {path.name} for {len(ids)} ids from {Path(raw_path).name}.")
+    except FileExistsError:
+        pass
+    finally:
+        tmp_path.unlink()
+
+
+def assign_row_ids(ids, path=ID_MAP_FILE):
+    """
+    Maps feed id strings to stable int64 surrogate keys.
+    Ids seen for the first time get the next free number and are appended
+    to the id map, so a given article keeps the same row_id across runs.
+    """
+    path = Path(path)
+    bootstrap_id_map(path)
+    id_map = load_id_map(path)
+    # Max rather than size, in case a concurrent writer appended an id twice
+    next_id = max(id_map.values(), default=-1) + 1
+
+    new_ids = {}
+    for raw_id in pd.unique(ids.dropna()):
+        if raw_id not in id_map and raw_id not in new_ids:
+            new_ids[raw_id] = next_id
+            next_id += 1
+
+    if new_ids:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        pd.DataFrame(list(new_ids.items()), columns=[ID_COLUMN, ROW_ID_COLUMN]).to_csv(
+            path, mode="a", index=False, header=not path.exists()
+        )
+        # Only cache ids once they are on disk
+        id_map.update(new_ids)
+        _id_map_cache[path] = (path.stat().st_size, id_map)
+
+    return ids.map(id_map).astype("Int64")
+
+# ==================================================
+# DERIVED TEXT
+# ==================================================
+
+def clean_text(text):
+    """Lowercased headline without urls, mentions, hashes or punctuation."""
+    if pd.isna(text):
+        return ""
+    text = text.lower()
+    text = re.sub(r"http\S+|www\S+", "", text)
+    text = re.sub(r"@\w+", "", text)
+    text = re.sub(r"#", "", text)
+    text = re.sub(r"[^a-zA-Z\s]", "", text)
+    text = re.sub(r"\s+", " ", text).strip()
+    return text
+
+# ==================================================
+# DTYPE ENFORCEMENT
+# ==================================================
+
+def lookup_row_ids(ids, path=ID_MAP_FILE):
+    """Read-only counterpart of assign_row_ids: unknown ids map to <NA>."""
+    bootstrap_id_map(path)
+    return ids.map(load_id_map(path)).astype("Int64")
+
+
+def enforce_schema(df, id_map_path=ID_MAP_FILE, assign_ids=True):
+    """
+    Applies the compact dtypes in place of whatever pandas inferred.
+    Only writer stages (transform, daemon) may assign new row_ids; with
+    assign_ids=False a legacy `id` column is mapped read-only (building a
+    missing id map from raw_data.csv) and rows the id map does not know yet
+    are dropped.
+    """
+    if ID_COLUMN in df.columns:
+        if ROW_ID_COLUMN not in df.columns:
+            ids = df[ID_COLUMN].astype(str)
+            if assign_ids:
+                df[ROW_ID_COLUMN] = assign_row_ids(ids, id_map_path)
+            else:
+                df[ROW_ID_COLUMN] = lookup_row_ids(ids, id_map_path)
+                unknown = int(df[ROW_ID_COLUMN].isna().sum())
+                if unknown:
+                    print(f"Skipping {unknown} rows whose id has no row_id yet; rerun the pipeline from transform.py.")
+        df = df.drop(columns=[ID_COLUMN])
+
+    if ROW_ID_COLUMN in df.columns:
+        df = df.dropna(subset=[ROW_ID_COLUMN])
+        df[ROW_ID_COLUMN] = df[ROW_ID_COLUMN].astype("int64")
+
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+
+    for col in FLOAT_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float32")
+
+    for col in TEXT_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype(TEXT_DTYPE)
+
+    if TIMESTAMP_COLUMN in df.columns:
+        df[TIMESTAMP_COLUMN] = pd.to_datetime(df[TIMESTAMP_COLUMN], errors="coerce")
+
+    # Surrogate key first so the on-disk layout stays familiar
+    if ROW_ID_COLUMN in df.columns:
+        df = df[[ROW_ID_COLUMN] + [c for c in df.columns if c != ROW_ID_COLUMN]]
+
+    return df
+
+
+def load_stage(path, id_map_path=ID_MAP_FILE, assign_ids=False, **read_kwargs):
+    """
+    Reads a pipeline CSV and returns it in the compact schema. Reading never
+    creates row_ids unless the caller is a writer and passes assign_ids.
+    """
+    read_kwargs.setdefault("encoding", "utf-8-sig")
+    dtypes = {col: "category" for col in CATEGORY_COLUMNS}
+    dtypes.update({col: "float32" for col in FLOAT_COLUMNS})
+    dtypes[ID_COLUMN] = str
+    # Older files still carry clean_text; it is rebuilt on demand instead
+    read_kwargs.setdefault("usecols", lambda col: col not in DERIVED_COLUMNS)
+    df = pd.read_csv(path, dtype=dtypes, **read_kwargs)
+    return enforce_schema(df, id_map_path, assign_ids=assign_ids)
+
+
+def fill_category(series, value):
+    """fillna for a categorical column, adding the fill value as a category if needed."""
+    if isinstance(series.dtype, pd.CategoricalDtype) and value not in series.cat.categories:
+        series = series.cat.add_categories([value])
+    return series.fillna(value)
+
+
+def memory_mb(df):
+    return df.memory_usage(deep=True).sum() / (1024 * 1024)
@@ -1,32 +1,44 @@
 import pandas as pd
-import re
+import sys
+import argparse
 import nltk
+from pathlib import Path
 from nltk.sentiment.vader import SentimentIntensityAnalyzer
 
-nltk.download('vader_lexicon')
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.append(str(PROJECT_ROOT / "src"))
+from schema import clean_text, enforce_schema, load_stage, memory_mb
+from dedup import assign_clusters
 
-INPUT_FILE = "data\processed\cleaned_data.csv"
-OUTPUT_FILE ="src/send/tweets_with_sentiment.csv"
+INPUT_FILE = PROJECT_ROOT / "data" / "processed" / "cleaned_data.csv"
+OUTPUT_FILE = PROJECT_ROOT / "src" / "send" / "tweets_with_sentiment.csv"
 
-df = pd.read_csv(INPUT_FILE)
+SCORE_COLUMNS = ["sentiment_score", "sent_pos", "sent_neu", "sent_neg", "sent_confidence"]
 
-def clean_text(text):
-    if pd.isna(text):
-        return ""
-    text = text.lower()
-    text = re.sub(r"http\S+|www\S+", "", text)
-    text = re.sub(r"@\w+", "", text)
-    text = re.sub(r"#", "", text)
-    text = re.sub(r"[^a-zA-Z\s]", "", text)
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
+# "nltk" scores text by text; "compiled" uses the array-backed engine in
+# vader_compiled.py, which matches nltk within its stated tolerance
+BACKENDS = ("nltk", "compiled")
+SENTIMENT_BACKEND = "nltk"
 
-df["clean_text"] = df["text"].apply(clean_text)
+_sia = None
+_compiled = None
 
-sia = SentimentIntensityAnalyzer()
+def get_analyzer():
+    global _sia
+    if _sia is None:
+        nltk.download('vader_lexicon')
+        _sia = SentimentIntensityAnalyzer()
+    return _sia
+
+def get_compiled_analyzer():
+    global _compiled
+    if _compiled is None:
+        from vader_compiled import CompiledVader
+        _compiled = CompiledVader(get_analyzer())
+    return _compiled
 
 def extract_sentiment_features(text):
-    scores = sia.polarity_scores(text)
+    scores = get_analyzer().polarity_scores(text)
     return pd.Series({
         "sentiment_score": scores["compound"],
         "sent_pos": scores["pos"],
@@ -35,10 +47,6 @@ def extract_sentiment_features(text):
         "sent_confidence": abs(scores["compound"])
     })
 
-df[["sentiment_score", "sent_pos", "sent_neu", "sent_neg", "sent_confidence"]] = (
-    df["clean_text"].apply(extract_sentiment_features)
-)
-
 def get_sentiment_label(score):
     if score >= 0.05:
         return "Positive"
@@ -47,9 +55,56 @@ def get_sentiment_label(score):
     else:
         return "Neutral"
 
-df["sentiment_label"] = df["sentiment_score"].apply(get_sentiment_label)
+def compiled_sentiment_features(texts):
+    scores = get_compiled_analyzer().polarity_scores_batch(texts.tolist())
+    return pd.DataFrame({
+        "sentiment_score": scores["compound"].to_numpy(),
+        "sent_pos": scores["pos"].to_numpy(),
+        "sent_neu": scores["neu"].to_numpy(),
+        "sent_neg": scores["neg"].to_numpy(),
+        "sent_confidence": scores["compound"].abs().to_numpy()
+    }, index=texts.index)
+
+def score_frame(df, index=None, backend=SENTIMENT_BACKEND):
+    """
+    Adds cluster_id, the VADER scores and the label to a cleaned frame.
+    clean_text is only built for scoring and is not kept in the result.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown sentiment backend: {backend}")
+
+    df = df.copy()
+    df["clean_text"] = df["text"].apply(clean_text)
+
+    # Group syndicated copies of the same story so each is scored once
+    df["cluster_id"] = assign_clusters(df, index=index)
+    print(f"{df['cluster_id'].nunique()} story clusters across {len(df)} rows.")
+
+    representatives = df.drop_duplicates(subset=["cluster_id"])
+    if backend == "compiled":
+        cluster_scores = compiled_sentiment_features(representatives["clean_text"])
+    else:
+        cluster_scores = representatives["clean_text"].apply(extract_sentiment_features)
+    cluster_scores.index = representatives["cluster_id"]
+
+    df[SCORE_COLUMNS] = cluster_scores.loc[df["cluster_id"]].to_numpy()
+    df["sentiment_label"] = df["sentiment_score"].apply(get_sentiment_label)
+
+    return enforce_schema(df.drop(columns=["clean_text"]))
+
+def run_sentiment(backend=SENTIMENT_BACKEND):
+    df = score_frame(load_stage(INPUT_FILE), backend=backend)
+    print(f"Scored dataset in memory: {memory_mb(df):.2f} MB")
+
+    df.to_csv(OUTPUT_FILE, index=False)
+
+    print("Sentiment analysis completed successfully.")
+    print("Output saved at:", OUTPUT_FILE)
 
-df.to_csv(OUTPUT_FILE, index=False)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score cleaned articles with VADER")
+    parser.add_argument("--backend", choices=BACKENDS, default=SENTIMENT_BACKEND,
+                        help="nltk (reference) or compiled (array-backed, faster)")
+    args = parser.parse_args()
 
-print("Sentiment analysis completed successfully.")
-print("Output saved at:", OUTPUT_FILE)
+    run_sentiment(backend=args.backend)
@@ -0,0 +1,289 @@
+import sys
+import time
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+# ==================================================
+# COMPILED, ARRAY-BACKED VADER
+# ==================================================
+# nltk's SentimentIntensityAnalyzer re-tokenizes every text and walks Python
+# dicts token by token. This engine compiles the same lexicon, booster words,
+# negation list and idioms once into a token-id vocabulary plus NumPy lookup
+# tables. It then scores a whole batch with array operations: every rule in
+# nltk's polarity_scores becomes a masked update over all tokens at once.
+#
+# It reproduces nltk's polarity_scores within COMPOUND_TOLERANCE /
+# PROPORTION_TOLERANCE for lowercase text such as Sentiment.clean_text
+# output. The only possible difference is float summation order, which can
+# move a score across a rounding boundary. ALL-CAPS emphasis is not
+# modelled, because clean_text lowercases everything first.
+
+COMPOUND_TOLERANCE = 1e-4
+PROPORTION_TOLERANCE = 1e-3
+
+OOV = 0  # every word outside the compiled vocabulary shares id 0
+
+
+def _round(values, ndigits):
+    # np.round and Python's round disagree on some .5 boundaries; nltk uses round()
+    return np.array([round(x, ndigits) for x in values.tolist()], dtype=float)
+
+
+class CompiledVader:
+
+    def __init__(self, sia=None):
+        if sia is None:
+            from nltk.sentiment.vader import SentimentIntensityAnalyzer
+            sia = SentimentIntensityAnalyzer()
+        c = sia.constants
+        self.n_scalar = c.N_SCALAR
+        self.b_decr = c.B_DECR
+        self.punc_list = c.PUNC_LIST
+        self.remove_punctuation = c.REGEX_REMOVE_PUNCTUATION
+
+        booster_words = {k: v for k, v in c.BOOSTER_DICT.items() if " " not in k}
+        booster_bigrams = [k.split() for k in c.BOOSTER_DICT if len(k.split()) == 2]
+        idioms = [(k.split(), v) for k, v in c.SPECIAL_CASE_IDIOMS.items()]
+        control = ["kind", "of", "but", "least", "at", "very", "never", "so", "this"]
+
+        words = set(sia.lexicon) | set(booster_words) | set(c.NEGATE) | set(control)
+        for parts in booster_bigrams + [p for p, _ in idioms]:
+            words.update(parts)
+
+        # id 0 is OOV, the last id stands for unknown words containing "n't"
+        self.vocab = {w: i + 1 for i, w in enumerate(sorted(words))}
+        self.nt_id = len(self.vocab) + 1
+        size = self.nt_id + 1
+
+        self.in_lex = np.zeros(size, dtype=bool)
+        self.valence = np.zeros(size)
+        self.is_booster = np.zeros(size, dtype=bool)
+        self.booster = np.zeros(size)
+        self.negated = np.zeros(size, dtype=bool)
+
+        for w, i in self.vocab.items():
+            if w in sia.lexicon:
+                self.in_lex[i] = True
+                self.valence[i] = sia.lexicon[w]
+            if w in booster_words:
+                self.is_booster[i] = True
+                self.booster[i] = booster_words[w]
+            self.negated[i] = w in c.NEGATE or "n't" in w
+        self.negated[self.nt_id] = True
+
+        ids = self.vocab.__getitem__
+        self.KIND, self.OF, self.BUT, self.LEAST = ids("kind"), ids("of"), ids("but"), ids("least")
+        self.AT, self.VERY, self.NEVER = ids("at"), ids("very"), ids("never")
+        self.SO, self.THIS = ids("so"), ids("this")
+        self.booster_bigrams = [tuple(ids(w) for w in parts) for parts in booster_bigrams]
+        self.idioms = [(tuple(ids(w) for w in parts), value) for parts, value in idioms]
+
+    # ----------------------------
+    # Tokenization
+    # ----------------------------
+    def _strip_punctuation(self, tok, words_only):
+        # nltk's SentiText: one trailing (preferred) or leading PUNC_LIST item
+        for p in self.punc_list:
+            if tok.endswith(p) and tok[:-len(p)] in words_only:
+                return tok[:-len(p)]
+        for p in self.punc_list:
+            if tok.startswith(p) and tok[len(p):] in words_only:
+                return tok[len(p):]
+        return tok
+
+    def encode(self, text):
+        """Token ids for one text, tokenized the way nltk's SentiText does."""
+        text = str(text)
+        get = self.vocab.get
+        words_only = None
+        out = []
+        for tok in text.split():
+            if len(tok) < 2:
+                continue
+            i = get(tok, OOV)
+            if i == OOV and not tok.isalpha():
+                if words_only is None:
+                    words_only = {w for w in self.remove_punctuation.sub("", text).split() if len(w) > 1}
+                tok = self._strip_punctuation(tok, words_only)
+                i = get(tok, OOV)
+            if i == OOV and "n't" in tok:
+                i = self.nt_id
+            out.append(i)
+        return out
+
+    # ----------------------------
+    # Batch scoring
+    # ----------------------------
+    def polarity_scores_batch(self, texts, token_ids=None):
+        """
+        Scores a batch of texts, returning a DataFrame with neg / neu / pos /
+        compound columns in input order. Pre-encoded token ids may be passed
+        to skip tokenization.
+        """
+        texts = ["" if pd.isna(t) else str(t) for t in texts]
+        if token_ids is None:
+            token_ids = [self.encode(t) for t in texts]
+        n_docs = len(token_ids)
+
+        lengths = np.fromiter((len(t) for t in token_ids), dtype=np.int64, count=n_docs)
+        t = np.fromiter((i for ids in token_ids for i in ids), dtype=np.int64, count=int(lengths.sum()))
+        doc = np.repeat(np.arange(n_docs), lengths)
+        starts = np.cumsum(lengths) - lengths
+        pos = np.arange(len(t)) - starts[doc]
+        doc_len = lengths[doc]
+
+        def prev(k):
+            shifted = np.concatenate([np.full(k, OOV), t[:-k] if k < len(t) else t[:0]])[:len(t)]
+            return np.where(pos >= k, shifted, OOV)
+
+        def nxt(k):
+            shifted = np.concatenate([t[k:], np.full(min(k, len(t)), OOV)])
+            return np.where(pos + k < doc_len, shifted, OOV)
+
+        w1, w2, w3 = prev(1), prev(2), prev(3)
+        n1, n2 = nxt(1), nxt(2)
+        has_n1 = pos + 1 < doc_len
+        has_n2 = pos + 2 < doc_len
+
+        def match(seq, key):
+            if len(seq) != len(key):
+                return np.zeros(len(t), dtype=bool)
+            m = np.ones(len(t), dtype=bool)
+            for col, k in zip(seq, key):
+                m &= col == k
+            return m
+
+        # "kind of" and single booster words score 0 themselves
+        skip = self.is_booster[t] | ((t == self.KIND) & has_n1 & (n1 == self.OF))
+        lex = self.in_lex[t] & ~skip
+        v = np.where(lex, self.valence[t], 0.0)
+
+        damp = [1.0, 0.95, 0.9]
+        for start_i, w in enumerate([w1, w2, w3]):
+            cond = lex & (pos > start_i) & ~self.in_lex[w]
+
+            s = np.where(v < 0, -self.booster[w], self.booster[w]) * damp[start_i]
+            v = np.where(cond, v + s, v)
+
+            # _never_check
+            if start_i == 0:
+                v = np.where(cond & self.negated[w1], v * self.n_scalar, v)
+            elif start_i == 1:
+                never_so = (w2 == self.NEVER) & ((w1 == self.SO) | (w1 == self.THIS))
+                v = np.where(cond & never_so, v * 1.5,
+                             np.where(cond & self.negated[w2], v * self.n_scalar, v))
+            else:
+                boost = ((w3 == self.NEVER) & ((w2 == self.SO) | (w2 == self.THIS))) | \
+                        ((w1 == self.SO) | (w1 == self.THIS))
+                v = np.where(cond & boost, v * 1.25,
+                             np.where(cond & self.negated[w3], v * self.n_scalar, v))
+
+                # _idioms_check: first matching preceding sequence wins
+                sequences = [(w1, t), (w2, w1, t), (w2, w1), (w3, w2, w1), (w3, w2)]
+                idiom_v = np.zeros(len(t))
+                matched = np.zeros(len(t), dtype=bool)
+                for seq in reversed(sequences):
+                    for key, value in self.idioms:
+                        m = match(seq, key)
+                        idiom_v = np.where(m, value, idiom_v)
+                        matched |= m
+                v = np.where(cond & matched, idiom_v, v)
+                for key, value in self.idioms:
+                    v = np.where(cond & has_n1 & match((t, n1), key), value, v)
+                for key, value in self.idioms:
+                    v = np.where(cond & has_n2 & match((t, n1, n2), key), value, v)
+
+                bigram = np.zeros(len(t), dtype=bool)
+                for key in self.booster_bigrams:
+                    bigram |= match((w3, w2), key) | match((w2, w1), key)
+                v = np.where(cond & bigram, v + self.b_decr, v)
+
+        # _least_check
+        least = ~self.in_lex[w1] & (w1 == self.LEAST)
+        v = np.where(lex & (pos > 1) & least & (w2 != self.AT) & (w2 != self.VERY), v * self.n_scalar, v)
+        v = np.where(lex & (pos == 1) & least, v * self.n_scalar, v)
+
+        # nltk scores a repeated word at its first index in the text
+        keys = doc * (self.nt_id + 1) + t
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        sentiments = v[first[inverse.ravel()]]
+
+        # _but_check
+        but_pos = np.full(n_docs, np.iinfo(np.int64).max)
+        is_but = t == self.BUT
+        np.minimum.at(but_pos, doc[is_but], pos[is_but])
+        bi = but_pos[doc]
+        has_but = bi != np.iinfo(np.int64).max
+        sentiments = np.where(has_but & (pos < bi), sentiments * 0.5,
+                              np.where(has_but & (pos > bi), sentiments * 1.5, sentiments))
+
+        # score_valence
+        sum_s = np.bincount(doc, weights=sentiments, minlength=n_docs)
+        pos_sum = np.bincount(doc, weights=np.where(sentiments > 0, sentiments + 1, 0.0), minlength=n_docs)
+        neg_sum = np.bincount(doc, weights=np.where(sentiments < 0, sentiments - 1, 0.0), minlength=n_docs)
+        neu_count = np.bincount(doc, weights=(sentiments == 0).astype(float), minlength=n_docs)
+
+        ep = np.minimum([x.count("!") for x in texts], 4) * 0.292
+        qm_count = np.array([x.count("?") for x in texts])
+        qm = np.where(qm_count > 1, np.where(qm_count <= 3, qm_count * 0.18, 0.96), 0.0)
+        amp = ep + qm
+
+        sum_s = np.where(sum_s > 0, sum_s + amp, np.where(sum_s < 0, sum_s - amp, sum_s))
+        compound = sum_s / np.sqrt(sum_s * sum_s + 15)
+
+        abs_neg = np.abs(neg_sum)
+        pos_wins = pos_sum > abs_neg
+        neg_wins = pos_sum < abs_neg
+        pos_sum = np.where(pos_wins, pos_sum + amp, pos_sum)
+        neg_sum = np.where(neg_wins, neg_sum - amp, neg_sum)
+
+        total = pos_sum + np.abs(neg_sum) + neu_count
+        has_tokens = lengths > 0
+        safe_total = np.where(has_tokens, total, 1.0)
+
+        return pd.DataFrame({
+            "neg": np.where(has_tokens, _round(np.abs(neg_sum / safe_total), 3), 0.0),
+            "neu": np.where(has_tokens, _round(np.abs(neu_count / safe_total), 3), 0.0),
+            "pos": np.where(has_tokens, _round(np.abs(pos_sum / safe_total), 3), 0.0),
+            "compound": np.where(has_tokens, _round(compound, 4), 0.0),
+        })
+
+# ==================================================
+# VALIDATION AGAINST NLTK
+# ==================================================
+
+def validate(texts, sia=None):
+    """Max absolute difference per score between nltk and the compiled engine."""
+    if sia is None:
+        from nltk.sentiment.vader import SentimentIntensityAnalyzer
+        sia = SentimentIntensityAnalyzer()
+    engine = CompiledVader(sia)
+
+    started = time.perf_counter()
+    reference = pd.DataFrame([sia.polarity_scores(t) for t in texts])
+    nltk_sec = time.perf_counter() - started
+
+    started = time.perf_counter()
+    compiled = engine.polarity_scores_batch(texts)
+    compiled_sec = time.perf_counter() - started
+
+    diffs = (reference[compiled.columns] - compiled).abs().max()
+    ok = diffs["compound"] <= COMPOUND_TOLERANCE and diffs[["neg", "neu", "pos"]].max() <= PROPORTION_TOLERANCE
+    return diffs, ok, nltk_sec, compiled_sec
+
+if __name__ == "__main__":
+    # Validation corpus: the scored dataset's headlines, cleaned as for scoring
+    sys.path.append(str(Path(__file__).resolve().parents[2] / "src"))
+    from schema import clean_text
+
+    corpus_file = Path(sys.argv[1]) if len(sys.argv) > 1 else \
+        Path(__file__).resolve().parent / "tweets_with_sentiment.csv"
+    texts = pd.read_csv(corpus_file)["text"].map(clean_text).tolist()
+
+    diffs, ok, nltk_sec, compiled_sec = validate(texts)
+    print(f"Validated {len(texts)} texts from {corpus_file}")
+    print("Max absolute difference vs nltk:")
+    print(diffs.to_string())
+    print(f"nltk: {nltk_sec:.3f}s, compiled: {compiled_sec:.3f}s ({nltk_sec / compiled_sec:.1f}x)")
+    print("PASS" if ok else "FAIL")
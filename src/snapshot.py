@@ -0,0 +1,198 @@
+import os
+import shutil
+import pandas as pd
+import pyarrow as pa
+from pathlib import Path
+from datetime import datetime
+
+# ==================================================
+# VERSIONED ARROW SNAPSHOTS FOR THE DASHBOARD
+# ==================================================
+# Each pipeline run publishes an immutable snapshot directory of
+# uncompressed Arrow IPC (Feather v2) files, one or more parts per table:
+#
+#   data/snapshots/<version>/tweets-00000.arrow
+#   data/snapshots/<version>/metrics-00000.arrow
+#   data/snapshots/CURRENT            <- name of the live version
+#
+# The version directory is fully written under a temporary name and then
+# renamed, and only after that is CURRENT swapped with os.replace, so a
+# reader never sees a half-written snapshot. Readers memory-map the files,
+# so every dashboard session in a process shares the same pages.
+#
+# Tables not republished are carried over from the previous version by hard
+# link, and `append` adds a new part on top of the existing ones. The daemon
+# can therefore publish each micro-batch without rewriting the history.
+# Once a table has more than COMPACT_MAX_PARTS parts, or its appended parts
+# exceed COMPACT_MAX_TAIL_MB, the publish rewrites it as a single part, so
+# readers never map and concatenate an ever-growing number of files.
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SNAPSHOT_DIR = PROJECT_ROOT / "data" / "snapshots"
+POINTER_NAME = "CURRENT"
+KEEP_VERSIONS = 3
+COMPACT_MAX_PARTS = 24        # about two hours of daemon batches at the default interval
+COMPACT_MAX_TAIL_MB = 64
+
+
+def _normalize(table):
+    """Fixed column types so parts written by different runs concatenate."""
+    fields = []
+    for field in table.schema:
+        if pa.types.is_dictionary(field.type):
+            fields.append(pa.field(field.name, pa.dictionary(pa.int32(), pa.large_string())))
+        elif pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+            fields.append(pa.field(field.name, pa.large_string()))
+        elif pa.types.is_timestamp(field.type):
+            fields.append(pa.field(field.name, pa.timestamp("ns", tz=field.type.tz)))
+        else:
+            fields.append(field)
+    return table.cast(pa.schema(fields))
+
+
+def _write_part(table, path):
+    with pa.OSFile(str(path), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    with open(path, "rb+") as f:
+        os.fsync(f.fileno())
+
+
+def _parts(version_dir, name):
+    return sorted(version_dir.glob(f"{name}-*.arrow"))
+
+
+def _needs_compaction(parts):
+    tail_bytes = sum(p.stat().st_size for p in parts[1:])
+    return len(parts) > COMPACT_MAX_PARTS or tail_bytes > COMPACT_MAX_TAIL_MB * 1024 * 1024
+
+
+def compact_table(version_dir, name):
+    """Rewrites all parts of a table in an unpublished version dir as one part."""
+    parts = _parts(version_dir, name)
+    if len(parts) < 2:
+        return
+    tables = []
+    for part in parts:
+        with pa.memory_map(str(part), "r") as source:
+            tables.append(pa.ipc.open_file(source).read_all())
+    # One dictionary per column: the IPC file format cannot replace it mid-file
+    table = pa.concat_tables(tables).unify_dictionaries().combine_chunks()
+
+    compacted = version_dir / f"{name}.compact"
+    _write_part(table, compacted)
+    for part in parts:
+        part.unlink()
+    os.replace(compacted, version_dir / f"{name}-00000.arrow")
+
+
+def _table_names(version_dir):
+    return sorted({p.name.rsplit("-", 1)[0] for p in version_dir.glob("*.arrow")})
+
+
+def current_version(snapshot_dir=SNAPSHOT_DIR):
+    pointer = Path(snapshot_dir) / POINTER_NAME
+    if not pointer.exists():
+        return None
+    version = pointer.read_text(encoding="utf-8").strip()
+    return version or None
+
+
+def publish_snapshot(tables=None, append=None, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Publishes a new snapshot version and makes it current.
+    `tables` replaces whole tables, `append` adds one part to a table and
+    every other table of the current version is carried over unchanged.
+    """
+    tables = tables or {}
+    append = append or {}
+    snapshot_dir = Path(snapshot_dir)
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+
+    previous = current_version(snapshot_dir)
+    previous_dir = snapshot_dir / previous if previous else None
+
+    version = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+    tmp_dir = snapshot_dir / f".tmp-{version}"
+    tmp_dir.mkdir()
+
+    carried = _table_names(previous_dir) if previous_dir and previous_dir.exists() else []
+    for name in carried:
+        if name in tables:
+            continue
+        for part in _parts(previous_dir, name):
+            try:
+                os.link(part, tmp_dir / part.name)
+            except OSError:
+                shutil.copy2(part, tmp_dir / part.name)
+
+    for name, df in tables.items():
+        _write_part(_normalize(pa.Table.from_pandas(df, preserve_index=False)), tmp_dir / f"{name}-00000.arrow")
+
+    for name, df in append.items():
+        existing = _parts(tmp_dir, name)
+        table = _normalize(pa.Table.from_pandas(df, preserve_index=False))
+        if existing:
+            # Parts must share one schema to be concatenated on read
+            with pa.memory_map(str(existing[0]), "r") as source:
+                schema = pa.ipc.open_file(source).schema
+            table = table.select(schema.names).cast(schema)
+        _write_part(table, tmp_dir / f"{name}-{len(existing):05d}.arrow")
+
+        if _needs_compaction(_parts(tmp_dir, name)):
+            compact_table(tmp_dir, name)
+
+    os.replace(tmp_dir, snapshot_dir / version)
+
+    pointer_tmp = snapshot_dir / f"{POINTER_NAME}.tmp"
+    with open(pointer_tmp, "w", encoding="utf-8") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer_tmp, snapshot_dir / POINTER_NAME)
+
+    prune_snapshots(snapshot_dir)
+    return version
+
+
+def prune_snapshots(snapshot_dir=SNAPSHOT_DIR, keep=KEEP_VERSIONS):
+    """Drops all but the newest `keep` versions; files still mapped elsewhere are retried later."""
+    snapshot_dir = Path(snapshot_dir)
+    versions = sorted(p for p in snapshot_dir.iterdir() if p.is_dir() and not p.name.startswith("."))
+    for old in versions[:-keep]:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def open_snapshot(version=None, snapshot_dir=SNAPSHOT_DIR):
+    """Memory-maps every table of a snapshot version as a pyarrow Table (zero-copy)."""
+    version = version or current_version(snapshot_dir)
+    if version is None:
+        return None
+    version_dir = Path(snapshot_dir) / version
+
+    tables = {}
+    for name in _table_names(version_dir):
+        parts = [pa.ipc.open_file(pa.memory_map(str(p), "r")).read_all() for p in _parts(version_dir, name)]
+        tables[name] = pa.concat_tables(parts) if len(parts) > 1 else parts[0]
+    return tables
+
+
+def _arrow_strings(arrow_type):
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return pd.StringDtype("pyarrow")
+    return None
+
+
+def read_snapshot(version=None, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Snapshot tables as pandas frames. Numeric columns and Arrow-backed
+    strings keep pointing into the memory-mapped files; only categorical
+    codes are materialised.
+    """
+    tables = open_snapshot(version, snapshot_dir)
+    if tables is None:
+        return None
+    return {
+        name: table.to_pandas(split_blocks=True, types_mapper=_arrow_strings)
+        for name, table in tables.items()
+    }
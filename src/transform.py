@@ -1,6 +1,8 @@
 import pandas as pd
 from pathlib import Path
 
+from schema import enforce_schema, memory_mb
+
 def run_clean_transform():
     project_root = Path(__file__).resolve().parent.parent
     raw_path = project_root / "data" / "raw" / "raw_data.csv"
@@ -12,7 +14,7 @@ def run_clean_transform():
         return
 
     print(f"Reading raw data...")
-    df = pd.read_csv(raw_path, encoding='utf-8-sig')
+    df = pd.read_csv(raw_path, encoding='utf-8-sig', dtype={'id': str})
 
     # 3. Clean Timestamps
     # Converts "Fri, 26 Dec 2025 07:00:00 GMT" to "2025-12-26 07:00:00"
@@ -24,6 +26,10 @@ def run_clean_transform():
     
     print(f"Removed {initial_count - len(df)} duplicate or empty rows.")
 
+    # Swap the feed id for its int64 row_id; the id string stays in raw_data.csv
+    df = enforce_schema(df)
+    print(f"In-memory size: {memory_mb(df):.2f} MB")
+
     proc_folder.mkdir(parents=True, exist_ok=True)
     df.to_csv(proc_path, index=False, encoding='utf-8-sig')
     